@@ -2,8 +2,14 @@ from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
 from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import HTTPException, status
+import asyncio
+import hashlib
 import os
+import time
 from dotenv import load_dotenv
+from profiling import record_bcrypt
 load_dotenv()
 
 # Секретный ключ для подписи JWT (НИКОГДА не публикуйте в коде!)
@@ -36,6 +42,105 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     
     return pwd_context.verify(plain_password, hashed_password)
 
+# bcrypt занимает 100–300 мс CPU: в async-обработчиках считаем его в пуле потоков
+# (bcrypt отпускает GIL), чтобы не блокировать event loop остальных запросов
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "4"))  # 0 — считать прямо в event loop
+PASSWORD_HASH_QUEUE_LIMIT = int(os.getenv("PASSWORD_HASH_QUEUE_LIMIT", "256"))
+
+
+class PasswordHashPool:
+    """Ограниченный пул для bcrypt: не больше workers вычислений одновременно,
+    не больше queue_limit ожидающих, сверх этого — 503"""
+
+    def __init__(self, workers: int, queue_limit: int):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self._executor = (
+            ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt") if workers > 0 else None
+        )
+        self._slots = asyncio.Semaphore(max(workers, 1))
+
+        self.waiting = 0
+        self.active = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.total_hash_seconds = 0.0
+
+    async def run(self, fn, *args):
+        if self._executor is None:
+            started = time.perf_counter()
+            try:
+                return self._timed(fn, *args)
+            finally:
+                record_bcrypt(time.perf_counter() - started)
+
+        if self.waiting >= self.queue_limit:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Сервер перегружен, повторите попытку позже",
+                headers={"Retry-After": "1"},
+            )
+
+        self.waiting += 1
+        queued_at = time.perf_counter()
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+
+        waited = time.perf_counter() - queued_at
+        self.total_wait_seconds += waited
+        self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+        self.active += 1
+        started = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, self._timed, fn, *args)
+        finally:
+            # Поток пула не видит контекст запроса, поэтому время засекается здесь
+            record_bcrypt(time.perf_counter() - started)
+            self.active -= 1
+            self._slots.release()
+
+    def _timed(self, fn, *args):
+        started = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            self.total_hash_seconds += time.perf_counter() - started
+            self.completed += 1
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "queue_limit": self.queue_limit,
+            "waiting": self.waiting,
+            "active": self.active,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_wait_seconds": self.total_wait_seconds / self.completed if self.completed else 0.0,
+            "max_wait_seconds": self.max_wait_seconds,
+            "avg_hash_seconds": self.total_hash_seconds / self.completed if self.completed else 0.0,
+        }
+
+
+password_hash_pool = PasswordHashPool(PASSWORD_HASH_WORKERS, PASSWORD_HASH_QUEUE_LIMIT)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """get_password_hash в пуле потоков"""
+    return await password_hash_pool.run(get_password_hash, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password в пуле потоков"""
+    return await password_hash_pool.run(verify_password, plain_password, hashed_password)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] =
     None) -> str: 
     to_encode = data.copy()
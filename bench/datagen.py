@@ -0,0 +1,136 @@
+"""Синтетические данные для нагрузочных прогонов: N пользователей и M задач
+с правдоподобными распределениями дедлайнов, важности и выполнения.
+
+Задачи распределены между пользователями неравномерно (немного «тяжёлых»
+пользователей), вставка идёт пачками в одной транзакции на пачку, счётчики
+user_task_stats пересобираются в конце. Одинаковый --seed даёт одинаковые данные.
+
+Запуск: python -m bench.datagen --users 100 --tasks 100000
+Пароль всех пользователей — BENCH_PASSWORD, администратор — bench-admin@example.com.
+"""
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List
+
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from auth_utils import get_password_hash
+from database import DATABASE_URL, create_engine_from_env
+from models import Base, Task, User, UserRole
+from search import create_search_index
+from task_stats import rebuild
+from utils import calculate_quadrant, calculate_urgent_from
+
+BENCH_PASSWORD = "bench-password"
+ADMIN_EMAIL = "bench-admin@example.com"
+
+WORDS = ("отчёт", "встреча", "звонок", "релиз", "ревью", "оплата", "план", "договор",
+         "презентация", "исправление", "бюджет", "собеседование", "миграция", "документация")
+
+IMPORTANT_SHARE = 0.4
+NO_DEADLINE_SHARE = 0.3
+# Дедлайны: просроченные, ближайшие три дня (срочные), дальше — до двух месяцев
+DEADLINE_WINDOWS = ((0.15, -30 * 24, 0), (0.35, 0, 3 * 24), (0.50, 3 * 24, 60 * 24))
+COMPLETED_SHARE = 0.35
+OVERDUE_COMPLETED_SHARE = 0.6
+
+
+def user_email(index: int) -> str:
+    return f"bench-user-{index}@example.com"
+
+
+def make_task(rng: random.Random, user_id: int, index: int, now: datetime) -> dict:
+    created_at = now - timedelta(minutes=rng.randint(0, 90 * 24 * 60))
+    is_important = rng.random() < IMPORTANT_SHARE
+
+    deadline_at = None
+    if rng.random() >= NO_DEADLINE_SHARE:
+        roll, start, end = rng.random(), 0, 0
+        for share, start, end in DEADLINE_WINDOWS:
+            if roll < share:
+                break
+            roll -= share
+        deadline_at = now + timedelta(hours=rng.uniform(start, end))
+
+    overdue = deadline_at is not None and deadline_at < now
+    completed = rng.random() < (OVERDUE_COMPLETED_SHARE if overdue else COMPLETED_SHARE)
+    completed_at = created_at + (now - created_at) * rng.random() if completed else None
+
+    return {
+        "title": f"{rng.choice(WORDS).capitalize()} {rng.choice(WORDS)} #{index}",
+        "description": f"{rng.choice(WORDS)}, {rng.choice(WORDS)}" if rng.random() < 0.6 else None,
+        "is_important": is_important,
+        "deadline_at": deadline_at,
+        "urgent_from": calculate_urgent_from(deadline_at),
+        "quadrant": calculate_quadrant(is_important, deadline_at, now),
+        "completed": completed,
+        "created_at": created_at,
+        "completed_at": completed_at,
+        "user_id": user_id,
+    }
+
+
+async def create_users(session_factory, count: int) -> List[int]:
+    """Пользователи bench-user-<i> и администратор; уже существующие не пересоздаются"""
+    hashed_password = get_password_hash(BENCH_PASSWORD)  # один bcrypt на всех
+    wanted = {user_email(i): (f"bench{i}", UserRole.USER) for i in range(count)}
+    wanted[ADMIN_EMAIL] = ("bench-admin", UserRole.ADMIN)
+
+    async with session_factory() as db:
+        existing = set((await db.execute(select(User.email).where(User.email.in_(wanted)))).scalars())
+        missing = [
+            {"nickname": nickname, "email": email, "hashed_password": hashed_password, "role": role}
+            for email, (nickname, role) in wanted.items() if email not in existing
+        ]
+        if missing:
+            await db.execute(insert(User), missing)
+            await db.commit()
+        ids: Dict[str, int] = dict((await db.execute(
+            select(User.email, User.id).where(User.email.in_(wanted))
+        )).all())
+    return [ids[user_email(i)] for i in range(count)]
+
+
+async def generate(url: str, users: int, tasks: int, batch_size: int, seed: int) -> None:
+    engine = create_engine_from_env(url)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(create_search_index)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+
+    rng = random.Random(seed)
+    user_ids = await create_users(session_factory, users)
+    # Парето: у немногих пользователей большая часть задач
+    weights = [rng.paretovariate(1.2) for _ in user_ids]
+    owners = rng.choices(user_ids, weights=weights, k=tasks)
+
+    now = datetime.now(timezone.utc)
+    started = time.perf_counter()
+    for offset in range(0, tasks, batch_size):
+        values = [make_task(rng, owners[index], index, now)
+                  for index in range(offset, min(offset + batch_size, tasks))]
+        async with session_factory() as db:
+            await db.execute(insert(Task.__table__), values)
+            await db.commit()
+    elapsed = time.perf_counter() - started
+
+    async with session_factory() as db:
+        await rebuild(db)
+    await engine.dispose()
+    print(f"{users} пользователей, {tasks} задач за {elapsed:.1f} с "
+          f"({tasks / elapsed if elapsed else 0:.0f} задач/с), seed={seed}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--tasks", type=int, default=100_000)
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--database-url", default=DATABASE_URL)
+    args = parser.parse_args()
+    asyncio.run(generate(args.database_url, args.users, args.tasks, args.batch_size, args.seed))
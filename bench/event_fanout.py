@@ -0,0 +1,69 @@
+"""Шина событий /tasks/stream: память на простаивающего подписчика, стоимость
+публикации и поведение при медленном клиенте.
+
+Запуск: python -m bench.event_fanout --subscribers 10000
+"""
+import argparse
+import asyncio
+import time
+import tracemalloc
+
+from events import EVENT_QUEUE_SIZE, EventBus, sse_stream, task_event
+
+
+async def idle_streams(bus: EventBus, count: int) -> list:
+    """Запустить count потоков SSE, ожидающих событий, как у подключённых клиентов"""
+    async def consume(stream):
+        async for _ in stream:
+            pass
+
+    streams = [
+        asyncio.create_task(consume(sse_stream(bus, bus.subscribe(user_id % 1000))))
+        for user_id in range(count)
+    ]
+    await asyncio.sleep(0)
+    return streams
+
+
+async def main(subscribers: int, events: int) -> None:
+    bus = EventBus()
+    await bus.start()
+
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    streams = await idle_streams(bus, subscribers)
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{subscribers} простаивающих подписчиков: {(after - before) / subscribers / 1024:.1f} КиБ на подписчика")
+
+    # Каждый пользователь слушает ~subscribers/1000 подключений
+    event = task_event("updated", 1, 1, {"id": 1, "title": "Задача"})
+    started = time.perf_counter()
+    for _ in range(events):
+        await bus.publish(event)
+    elapsed = time.perf_counter() - started
+    print(f"публикация: {events / elapsed:10.0f} событий/с, {bus.metrics()['delivered']} доставок")
+
+    for stream in streams:
+        stream.cancel()
+    await asyncio.gather(*streams, return_exceptions=True)
+
+    # Медленный клиент: никто не читает очередь
+    for policy in ("resync", "disconnect"):
+        slow_bus = EventBus(policy=policy)
+        await slow_bus.start()
+        subscription = slow_bus.subscribe(1)
+        await slow_bus.publish_many(event for _ in range(EVENT_QUEUE_SIZE * 3))
+        print(f"{policy:>10}: в очереди {subscription.queue.qsize()}, переполнений "
+              f"{slow_bus.metrics()['overflows']}, поток закрыт: {subscription.closed}")
+        await slow_bus.stop()
+
+    await bus.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--subscribers", type=int, default=10_000)
+    parser.add_argument("--events", type=int, default=1_000)
+    args = parser.parse_args()
+    asyncio.run(main(args.subscribers, args.events))
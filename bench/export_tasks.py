@@ -0,0 +1,60 @@
+"""Выгрузка задач: пропускная способность (строк/с) и пик памяти потокового
+экспорта NDJSON/CSV против сборки всего списка в один JSON-документ.
+
+Запуск: python -m bench.export_tasks --rows 100000
+"""
+import argparse
+import asyncio
+import time
+import tracemalloc
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from bench.serialize_tasks import fill
+from responses import dumps
+from serializers import TASK_COLUMNS, task_page
+from task_export import csv_chunks, ndjson_chunks
+
+
+async def buffered(session_factory) -> int:
+    """Прежний путь: все строки в памяти и один JSON-документ"""
+    async with session_factory() as db:
+        rows = (await db.execute(select(*TASK_COLUMNS))).all()
+    return len(dumps(task_page(rows, None)))
+
+
+def streamed(chunks):
+    async def run(session_factory) -> int:
+        size = 0
+        async for chunk in chunks(session_factory):
+            size += len(chunk)
+        return size
+    return run
+
+
+async def main(rows: int) -> None:
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    await fill(engine, rows)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+
+    for label, fn in (("JSON целиком", buffered),
+                      ("поток NDJSON", streamed(ndjson_chunks)),
+                      ("поток CSV", streamed(csv_chunks))):
+        tracemalloc.start()
+        started = time.perf_counter()
+        size = await fn(session_factory)
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{label:>14}: {rows / elapsed:10.0f} строк/с, "
+              f"{size / 2**20:7.1f} МиБ ответа, пик памяти {peak / 2**20:7.1f} МиБ")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args()
+    asyncio.run(main(args.rows))
@@ -0,0 +1,78 @@
+"""Пропускная способность потоковой загрузки задач (строк/с) в файл SQLite в режиме WAL.
+
+Запуск: python -m bench.import_tasks --rows 100000
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from database import create_engine_from_env
+from models import Base, User, UserRole
+from task_import import IMPORT_BATCH_SIZE, csv_records, import_tasks, ndjson_records, read_lines
+
+CHUNK_SIZE = 64 * 1024
+
+
+def make_ndjson(rows: int) -> bytes:
+    deadline = datetime.now(timezone.utc) + timedelta(days=30)
+    return "".join(
+        json.dumps({"title": f"Задача {i}", "description": "Описание задачи для бенчмарка",
+                    "is_important": i % 2 == 0,
+                    "deadline_at": (deadline + timedelta(minutes=i)).isoformat()}) + "\n"
+        for i in range(rows)
+    ).encode()
+
+
+def make_csv(rows: int) -> bytes:
+    deadline = datetime.now(timezone.utc) + timedelta(days=30)
+    lines = ["title,description,is_important,deadline_at"]
+    lines.extend(
+        f"Задача {i},Описание задачи для бенчмарка,{'true' if i % 2 == 0 else 'false'},"
+        f"{(deadline + timedelta(minutes=i)).isoformat()}"
+        for i in range(rows)
+    )
+    return ("\n".join(lines) + "\n").encode()
+
+
+async def upload(data: bytes):
+    # Имитация тела запроса, приходящего кусками
+    for start in range(0, len(data), CHUNK_SIZE):
+        yield data[start:start + CHUNK_SIZE]
+
+
+async def run(label: str, data: bytes, records, rows: int) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine_from_env(f"sqlite+aiosqlite:///{os.path.join(directory, 'bench.db')}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.execute(insert(User).values(
+                nickname="bench", email="bench@example.com", hashed_password="x", role=UserRole.USER
+            ))
+
+        async with async_sessionmaker(engine, expire_on_commit=False)() as db:
+            started = time.perf_counter()
+            summary = await import_tasks(db, 1, records(read_lines(upload(data))))
+            elapsed = time.perf_counter() - started
+        await engine.dispose()
+
+    assert summary["imported"] == rows, summary
+    print(f"{label:>7}: {rows / elapsed:10.0f} строк/с ({elapsed:.2f} с, пачка {IMPORT_BATCH_SIZE})")
+
+
+async def main(rows: int) -> None:
+    await run("NDJSON", make_ndjson(rows), ndjson_records, rows)
+    await run("CSV", make_csv(rows), csv_records, rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args()
+    asyncio.run(main(args.rows))
@@ -0,0 +1,68 @@
+"""Микробенчмарк сериализации ответа со списком задач: путь FastAPI по умолчанию
+(валидация response_model + jsonable_encoder + json.dumps) против FastJSONResponse.
+
+Запуск: python -m bench.json_responses
+"""
+import argparse
+import random
+import timeit
+from datetime import datetime, timedelta, timezone
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from responses import FastJSONResponse, orjson
+from schemas import TaskPage, TaskResponse
+from serializers import serialize_tasks
+
+
+def make_rows(count: int) -> list:
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    return [
+        (
+            i, f"Задача {i}", "Описание задачи для бенчмарка", random.random() < 0.5,
+            now + timedelta(hours=random.randint(1, 24 * 30)),
+            random.choice(["Q1", "Q2", "Q3", "Q4"]), False, now, None,
+        )
+        for i in range(1, count + 1)
+    ]
+
+
+def prebuilt_models(content: dict) -> bytes:
+    """Как было: TaskResponse в обработчике + повторная валидация response_model"""
+    page = TaskPage(items=[TaskResponse(**item) for item in content["items"]], next_cursor=None)
+    validated = TaskPage.model_validate(page.model_dump())
+    return JSONResponse(jsonable_encoder(validated)).body
+
+
+def default_path(content: dict) -> bytes:
+    """Словари из serialize_tasks, но через response_model"""
+    validated = TaskPage.model_validate(content)
+    return JSONResponse(jsonable_encoder(validated)).body
+
+
+def fast_path(content: dict) -> bytes:
+    return FastJSONResponse(content).body
+
+
+def main(sizes, number: int) -> None:
+    print(f"Сериализатор быстрого пути: {'orjson' if orjson is not None else 'pydantic_core.to_json'}")
+    for size in sizes:
+        content = {"items": serialize_tasks(make_rows(size)), "next_cursor": None}
+        loops = max(1, number // size)
+        results = []
+        for label, fn in (("TaskResponse x2", prebuilt_models),
+                          ("response_model", default_path),
+                          ("FastJSONResponse", fast_path)):
+            elapsed = min(timeit.repeat(lambda: fn(content), number=loops, repeat=3)) / loops
+            results.append(f"{label} {elapsed * 1e6:10.1f} мкс")
+        print(f"{size:>6} задач: " + " | ".join(results))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 100, 10_000])
+    parser.add_argument("--number", type=int, default=20_000,
+                        help="примерное число сериализованных задач на замер")
+    args = parser.parse_args()
+    main(args.sizes, args.number)
@@ -0,0 +1,360 @@
+"""Нагрузочный прогон по всем роутерам приложения (auth, tasks, stats, users).
+
+Каждый из --concurrency клиентов работает от имени своего пользователя из
+bench.datagen и без пауз выбирает следующую операцию по весам SCENARIO.
+По умолчанию приложение из main.py вызывается в процессе через ASGI;
+с --url запросы идут на запущенный uvicorn. Итог — JSON-отчёт с rps и
+p50/p95/p99 по каждому эндпоинту (см. bench.report).
+
+Подготовка: python -m bench.datagen --users 100 --tasks 100000
+В процессе: python -m bench.load --duration 30 --concurrency 16
+На uvicorn: python -m bench.load --url http://127.0.0.1:8000
+Сравнение:  python -m bench.report bench-results/<старый>.json bench-results/<новый>.json
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+from bench.datagen import ADMIN_EMAIL, BENCH_PASSWORD, WORDS, user_email
+from bench.report import build_report, print_report, write_report
+
+# Смена пароля выполняется туда и обратно — временный пароль на это время
+SPARE_PASSWORD = BENCH_PASSWORD + "-2"
+
+
+class Worker:
+    """Один виртуальный клиент: свой пользователь, свои задачи и позиция синхронизации"""
+
+    def __init__(self, client: httpx.AsyncClient, stats: "Stats", rng: random.Random,
+                 email: str, token: str, admin_token: str, exclusive: bool):
+        self.client = client
+        self.stats = stats
+        self.rng = rng
+        self.email = email
+        self.headers = {"Authorization": f"Bearer {token}"}
+        self.admin_headers = {"Authorization": f"Bearer {admin_token}"}
+        # Пользователь не делится с другими клиентами — можно менять ему пароль
+        self.exclusive = exclusive
+        self.nickname: Optional[str] = None
+        self.task_ids: List[int] = []
+        self.created_ids: List[int] = []
+        self.next_cursor: Optional[str] = None
+        self.sync_token: Optional[str] = None
+
+    async def request(self, label: str, method: str, url: str, *, admin: bool = False,
+                      expected=(), **kwargs) -> Optional[httpx.Response]:
+        headers = self.admin_headers if admin else self.headers
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, headers=headers, **kwargs)
+        except httpx.HTTPError:
+            self.stats.error(label)
+            return None
+        elapsed = (time.perf_counter() - started) * 1000
+        if response.status_code >= 400 and response.status_code not in expected:
+            self.stats.error(label)
+            return None
+        self.stats.observe(label, elapsed)
+        return response
+
+    async def setup(self) -> None:
+        response = await self.client.get("/users/me", headers=self.headers)
+        response.raise_for_status()
+        self.nickname = response.json()["nickname"]
+        response = await self.client.get("/tasks", params={"limit": 500}, headers=self.headers)
+        response.raise_for_status()
+        self.task_ids = [task["id"] for task in response.json()["items"]]
+
+    def pick_task(self) -> Optional[int]:
+        # В основном задачи из datagen, иногда только что созданные в прогоне
+        pool = self.created_ids if self.created_ids and (self.rng.random() < 0.3 or not self.task_ids) \
+            else self.task_ids
+        return self.rng.choice(pool) if pool else None
+
+    def new_task(self) -> dict:
+        deadline = None
+        if self.rng.random() < 0.7:
+            deadline = (date.today() + timedelta(days=self.rng.randint(0, 30))).isoformat() + "T18:00:00Z"
+        return {"title": f"{self.rng.choice(WORDS).capitalize()} {self.rng.randint(1, 10**6)}",
+                "is_important": self.rng.random() < 0.4, "deadline_at": deadline}
+
+
+# --- auth ---
+
+async def auth_login(worker: Worker) -> None:
+    await worker.request("POST /auth/login", "POST", "/auth/login",
+                         data={"username": worker.email, "password": BENCH_PASSWORD})
+
+
+async def auth_me(worker: Worker) -> None:
+    await worker.request("GET /auth/me", "GET", "/auth/me")
+
+
+async def auth_change_password(worker: Worker) -> None:
+    if not worker.exclusive:
+        return await auth_me(worker)
+    label = "PATCH /auth/change-password"
+    await worker.request(label, "PATCH", "/auth/change-password",
+                         json={"old_password": BENCH_PASSWORD, "new_password": SPARE_PASSWORD})
+    await worker.request(label, "PATCH", "/auth/change-password",
+                         json={"old_password": SPARE_PASSWORD, "new_password": BENCH_PASSWORD})
+
+
+# --- users ---
+
+async def users_me(worker: Worker) -> None:
+    await worker.request("GET /users/me", "GET", "/users/me")
+
+
+async def users_update(worker: Worker) -> None:
+    await worker.request("PUT /users/me", "PUT", "/users/me", json={"nickname": worker.nickname})
+
+
+# --- tasks: чтение ---
+
+async def tasks_list(worker: Worker) -> None:
+    # Каждый третий раз — следующая страница, как при прокрутке списка
+    params = {"cursor": worker.next_cursor} if worker.next_cursor and worker.rng.random() < 0.33 else {}
+    response = await worker.request("GET /tasks", "GET", "/tasks", params=params)
+    if response is not None:
+        worker.next_cursor = response.json()["next_cursor"]
+
+
+async def tasks_get(worker: Worker) -> None:
+    task_id = worker.pick_task()
+    if task_id is not None:
+        await worker.request("GET /tasks/{task_id}", "GET", f"/tasks/{task_id}", expected=(404,))
+
+
+async def tasks_search(worker: Worker) -> None:
+    await worker.request("GET /tasks/search", "GET", "/tasks/search", params={"q": worker.rng.choice(WORDS)[:4]})
+
+
+async def tasks_quadrant(worker: Worker) -> None:
+    quadrant = worker.rng.choice(("Q1", "Q2", "Q3", "Q4"))
+    await worker.request("GET /tasks/quadrant/{quadrant}", "GET", f"/tasks/quadrant/{quadrant}")
+
+
+async def tasks_status(worker: Worker) -> None:
+    status = worker.rng.choice(("pending", "completed"))
+    await worker.request("GET /tasks/status/{status}", "GET", f"/tasks/status/{status}")
+
+
+async def tasks_today(worker: Worker) -> None:
+    await worker.request("GET /tasks/today", "GET", "/tasks/today")
+
+
+async def tasks_due(worker: Worker) -> None:
+    start = date.today()
+    await worker.request("GET /tasks/due", "GET", "/tasks/due",
+                         params={"from": start.isoformat(), "to": (start + timedelta(days=7)).isoformat()})
+
+
+async def tasks_changes(worker: Worker) -> None:
+    params = {"since": worker.sync_token} if worker.sync_token else {}
+    response = await worker.request("GET /tasks/changes", "GET", "/tasks/changes", params=params)
+    if response is not None:
+        worker.sync_token = response.json()["next_token"]
+
+
+async def tasks_export(worker: Worker) -> None:
+    await worker.request("GET /tasks/export", "GET", "/tasks/export", params={"format": "ndjson"})
+
+
+# --- tasks: запись ---
+
+async def tasks_create(worker: Worker) -> None:
+    response = await worker.request("POST /tasks/", "POST", "/tasks/", json=worker.new_task())
+    if response is not None:
+        worker.created_ids.append(response.json()["id"])
+
+
+async def tasks_update(worker: Worker) -> None:
+    task_id = worker.pick_task()
+    if task_id is not None:
+        await worker.request("PUT /tasks/{task_id}", "PUT", f"/tasks/{task_id}",
+                             json={"title": worker.new_task()["title"]}, expected=(404,))
+
+
+async def tasks_complete(worker: Worker) -> None:
+    task_id = worker.pick_task()
+    if task_id is not None:
+        await worker.request("PATCH /tasks/{task_id}/complete", "PATCH", f"/tasks/{task_id}/complete",
+                             expected=(404,))
+
+
+async def tasks_delete(worker: Worker) -> None:
+    # Удаляются только созданные в прогоне задачи, чтобы данные datagen не таяли
+    if not worker.created_ids:
+        return await tasks_create(worker)
+    task_id = worker.created_ids.pop(worker.rng.randrange(len(worker.created_ids)))
+    await worker.request("DELETE /tasks/{task_id}", "DELETE", f"/tasks/{task_id}", expected=(404,))
+
+
+async def tasks_batch_create(worker: Worker) -> None:
+    response = await worker.request("POST /tasks/batch", "POST", "/tasks/batch",
+                                    json=[worker.new_task() for _ in range(20)])
+    if response is not None:
+        worker.created_ids.extend(item["id"] for item in response.json()["results"] if item["id"])
+
+
+async def tasks_batch_update(worker: Worker) -> None:
+    ids = {worker.pick_task() for _ in range(10)} - {None}
+    if ids:
+        await worker.request("PATCH /tasks/batch", "PATCH", "/tasks/batch",
+                             json=[{"id": task_id, "is_important": worker.rng.random() < 0.5} for task_id in ids])
+
+
+async def tasks_batch_complete(worker: Worker) -> None:
+    ids = sorted({worker.pick_task() for _ in range(10)} - {None})
+    if ids:
+        await worker.request("POST /tasks/batch/complete", "POST", "/tasks/batch/complete",
+                             json={"ids": ids, "completed": worker.rng.random() < 0.5})
+
+
+async def tasks_import(worker: Worker) -> None:
+    body = "\n".join(json.dumps(worker.new_task(), ensure_ascii=False) for _ in range(50))
+    await worker.request("POST /tasks/import", "POST", "/tasks/import",
+                         params={"format": "ndjson"}, content=body.encode())
+
+
+# --- stats ---
+
+async def stats_summary(worker: Worker) -> None:
+    await worker.request("GET /stats/", "GET", "/stats/")
+
+
+async def stats_deadlines(worker: Worker) -> None:
+    await worker.request("GET /stats/deadlines", "GET", "/stats/deadlines")
+
+
+async def stats_users(worker: Worker) -> None:
+    await worker.request("GET /stats/users", "GET", "/stats/users", admin=True)
+
+
+# (роутер, вес, операция); веса примерно повторяют смесь веб-клиента: чтение списков
+# преобладает, bcrypt (логин, смена пароля) и тяжёлые выгрузки — редкие
+SCENARIO: List[tuple] = [
+    ("auth", 1, auth_login),
+    ("auth", 3, auth_me),
+    ("auth", 1, auth_change_password),
+    ("users", 2, users_me),
+    ("users", 1, users_update),
+    ("tasks", 10, tasks_list),
+    ("tasks", 6, tasks_get),
+    ("tasks", 3, tasks_search),
+    ("tasks", 4, tasks_quadrant),
+    ("tasks", 3, tasks_status),
+    ("tasks", 2, tasks_today),
+    ("tasks", 2, tasks_due),
+    ("tasks", 2, tasks_changes),
+    ("tasks", 1, tasks_export),
+    ("tasks", 4, tasks_create),
+    ("tasks", 2, tasks_update),
+    ("tasks", 2, tasks_complete),
+    ("tasks", 2, tasks_delete),
+    ("tasks", 1, tasks_batch_create),
+    ("tasks", 1, tasks_batch_update),
+    ("tasks", 1, tasks_batch_complete),
+    ("tasks", 1, tasks_import),
+    ("stats", 4, stats_summary),
+    ("stats", 2, stats_deadlines),
+    ("stats", 1, stats_users),
+]
+
+
+class Stats:
+    def __init__(self):
+        self.recording = False
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    def observe(self, label: str, elapsed_ms: float) -> None:
+        if self.recording:
+            self.latencies[label].append(elapsed_ms)
+
+    def error(self, label: str) -> None:
+        if self.recording:
+            self.errors[label] += 1
+
+
+async def login(client: httpx.AsyncClient, email: str) -> str:
+    response = await client.post("/auth/login", data={"username": email, "password": BENCH_PASSWORD})
+    if response.status_code != 200:
+        raise SystemExit(f"Не удалось войти как {email} ({response.status_code}): "
+                         f"сначала выполните python -m bench.datagen")
+    return response.json()["access_token"]
+
+
+async def run_worker(worker: Worker, actions: List[Callable[[Worker], Awaitable[None]]],
+                     weights: List[int], deadline: float, think: float) -> None:
+    while time.perf_counter() < deadline:
+        await worker.rng.choices(actions, weights=weights)[0](worker)
+        if think:
+            await asyncio.sleep(think)
+
+
+def make_client(url: Optional[str], concurrency: int) -> httpx.AsyncClient:
+    if url:
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        return httpx.AsyncClient(base_url=url, limits=limits, timeout=60)
+    from main import app  # импорт только для прогона в процессе: main подключается к БД
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=60)
+
+
+async def main(args) -> None:
+    routers = set(args.routers.split(","))
+    scenario = [(fn, weight) for router, weight, fn in SCENARIO if router in routers]
+    actions, weights = [fn for fn, _ in scenario], [weight for _, weight in scenario]
+
+    stats = Stats()
+    async with make_client(args.url, args.concurrency) as client:
+        # Логин выполняется один раз на пользователя и в замеры не попадает
+        emails = [user_email(i % args.users) for i in range(args.concurrency)]
+        tokens = dict(zip(set(emails), await asyncio.gather(*(login(client, email) for email in set(emails)))))
+        admin_token = await login(client, ADMIN_EMAIL)
+        workers = [
+            Worker(client, stats, random.Random(args.seed * 1000 + i), email, tokens[email], admin_token,
+                   exclusive=args.concurrency <= args.users)
+            for i, email in enumerate(emails)
+        ]
+        await asyncio.gather(*(worker.setup() for worker in workers))
+
+        if args.warmup:
+            await asyncio.gather(*(run_worker(worker, actions, weights, time.perf_counter() + args.warmup,
+                                              args.think_ms / 1000) for worker in workers))
+        stats.recording = True
+        started = time.perf_counter()
+        deadline = started + args.duration
+        await asyncio.gather(*(run_worker(worker, actions, weights, deadline, args.think_ms / 1000)
+                               for worker in workers))
+        elapsed = time.perf_counter() - started
+
+    params = {"target": args.url or "asgi", "duration": args.duration, "concurrency": args.concurrency,
+              "users": args.users, "routers": sorted(routers), "seed": args.seed, "think_ms": args.think_ms}
+    report = build_report("load", params, stats.latencies, stats.errors, elapsed)
+    print_report(report)
+    path = args.report or f"bench-results/load-{report['commit'] or 'unknown'}-{int(time.time())}.json"
+    write_report(report, path)
+    print(f"Отчёт: {path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="адрес запущенного сервера; без него — приложение в процессе через ASGI")
+    parser.add_argument("--duration", type=float, default=30.0, help="длительность замера, с")
+    parser.add_argument("--warmup", type=float, default=3.0, help="прогрев без записи результатов, с")
+    parser.add_argument("--concurrency", type=int, default=16, help="одновременных клиентов")
+    parser.add_argument("--users", type=int, default=100, help="сколько пользователей datagen использовать")
+    parser.add_argument("--routers", default="auth,tasks,stats,users", help="роутеры через запятую")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="пауза клиента между запросами, мс")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--report", help="путь JSON-отчёта (по умолчанию bench-results/load-<коммит>-<время>.json)")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,84 @@
+"""Нагрузочный тест: задержка GET /tasks во время шторма логинов.
+
+Приложение запускается в процессе через ASGI (httpx.ASGITransport), поэтому
+блокировка event loop bcrypt'ом напрямую видна в задержках GET /tasks.
+
+До (bcrypt в event loop):  PASSWORD_HASH_WORKERS=0 python -m bench.login_storm
+После (пул потоков):       python -m bench.login_storm
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+
+import httpx
+
+from auth_utils import PASSWORD_HASH_WORKERS
+from create_tables import create_tables
+from main import app
+
+PASSWORD = "storm-password"
+
+
+def percentile(values, q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+async def login(client: httpx.AsyncClient, email: str) -> str:
+    response = await client.post("/auth/login", data={"username": email, "password": PASSWORD})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def storm(client: httpx.AsyncClient, email: str, stop: asyncio.Event, counter: list) -> None:
+    while not stop.is_set():
+        await login(client, email)
+        counter[0] += 1
+
+
+async def main(duration: float, concurrency: int, tasks: int) -> None:
+    await create_tables()
+
+    email = f"storm-{uuid.uuid4().hex[:8]}@example.com"
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        response = await client.post("/auth/register", json={
+            "nickname": email.split("@")[0], "email": email, "password": PASSWORD
+        })
+        response.raise_for_status()
+        headers = {"Authorization": "Bearer " + await login(client, email)}
+        for i in range(tasks):
+            await client.post("/tasks/", json={"title": f"Задача {i}", "is_important": i % 2 == 0},
+                              headers=headers)
+
+        stop = asyncio.Event()
+        logins = [0]
+        stormers = [asyncio.create_task(storm(client, email, stop, logins)) for _ in range(concurrency)]
+
+        latencies = []
+        deadline = time.perf_counter() + duration
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            (await client.get("/tasks", headers=headers)).raise_for_status()
+            latencies.append((time.perf_counter() - started) * 1000)
+            await asyncio.sleep(0.01)
+
+        stop.set()
+        await asyncio.gather(*stormers)
+
+    mode = f"пул из {PASSWORD_HASH_WORKERS} потоков" if PASSWORD_HASH_WORKERS else "bcrypt в event loop"
+    print(f"Режим: {mode}; логинов за {duration:.0f} с: {logins[0]}")
+    print(f"GET /tasks: запросов {len(latencies)}, p50 {statistics.median(latencies):.1f} мс, "
+          f"p95 {percentile(latencies, 0.95):.1f} мс, p99 {percentile(latencies, 0.99):.1f} мс, "
+          f"max {max(latencies):.1f} мс")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=10.0, help="длительность шторма, с")
+    parser.add_argument("--concurrency", type=int, default=8, help="одновременных логинов")
+    parser.add_argument("--tasks", type=int, default=50, help="задач у тестового пользователя")
+    args = parser.parse_args()
+    asyncio.run(main(args.duration, args.concurrency, args.tasks))
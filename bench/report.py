@@ -0,0 +1,109 @@
+"""Отчёты нагрузочных прогонов в JSON и сравнение двух прогонов.
+
+Сравнение (например, до и после коммита):
+    python -m bench.report bench-results/old.json bench-results/new.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+
+# Версия формата отчёта: растёт при несовместимых изменениях полей
+REPORT_VERSION = 1
+
+
+def percentile(values: List[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+def latency_summary(latencies: List[float], errors: int, elapsed: float) -> dict:
+    """Пропускная способность и перцентили задержки (мс) по одному эндпоинту"""
+    summary = {"requests": len(latencies), "errors": errors,
+               "rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0}
+    if latencies:
+        summary.update({
+            "p50_ms": round(percentile(latencies, 0.50), 3),
+            "p95_ms": round(percentile(latencies, 0.95), 3),
+            "p99_ms": round(percentile(latencies, 0.99), 3),
+            "max_ms": round(max(latencies), 3),
+        })
+    return summary
+
+
+def git_commit() -> Optional[str]:
+    """Текущий коммит, чтобы отчёты разных версий можно было сопоставить"""
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, check=True, cwd=os.path.dirname(os.path.dirname(__file__)))
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True,
+                           text=True, cwd=os.path.dirname(os.path.dirname(__file__))).stdout.strip()
+    return result.stdout.strip() + ("-dirty" if dirty else "")
+
+
+def build_report(name: str, params: dict, latencies: Dict[str, List[float]],
+                 errors: Dict[str, int], elapsed: float) -> dict:
+    everything = [value for values in latencies.values() for value in values]
+    return {
+        "version": REPORT_VERSION,
+        "benchmark": name,
+        "commit": git_commit(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "params": params,
+        "elapsed_s": round(elapsed, 3),
+        "total": latency_summary(everything, sum(errors.values()), elapsed),
+        "endpoints": {
+            label: latency_summary(latencies[label], errors.get(label, 0), elapsed)
+            for label in sorted(latencies.keys() | errors.keys())
+        },
+    }
+
+
+def write_report(report: dict, path: str) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(report, file, ensure_ascii=False, indent=2)
+
+
+def print_report(report: dict, out=sys.stdout) -> None:
+    print(f"{'эндпоинт':<36} {'запр.':>7} {'ошиб.':>6} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8}", file=out)
+    for label, summary in (*report["endpoints"].items(), ("ИТОГО", report["total"])):
+        print(f"{label:<36} {summary['requests']:>7} {summary['errors']:>6} {summary['rps']:>8.1f} "
+              f"{summary.get('p50_ms', 0):>8.1f} {summary.get('p95_ms', 0):>8.1f} "
+              f"{summary.get('p99_ms', 0):>8.1f}", file=out)
+
+
+def _change(old: Optional[float], new: Optional[float]) -> str:
+    if not old or new is None:
+        return "—"
+    return f"{(new - old) / old * 100:+.1f}%"
+
+
+def compare(old: dict, new: dict) -> None:
+    """Изменение rps и перцентилей по эндпоинтам, присутствующим в обоих отчётах"""
+    print(f"{old.get('commit')} -> {new.get('commit')}")
+    if old["params"] != new["params"]:
+        print(f"Внимание: параметры прогонов различаются: {old['params']} / {new['params']}")
+    print(f"{'эндпоинт':<36} {'rps':>9} {'p50':>9} {'p95':>9} {'p99':>9}")
+    rows = [(label, old["endpoints"][label], new["endpoints"][label])
+            for label in sorted(old["endpoints"].keys() & new["endpoints"].keys())]
+    rows.append(("ИТОГО", old["total"], new["total"]))
+    for label, before, after in rows:
+        print(f"{label:<36} {_change(before['rps'], after['rps']):>9}"
+              + "".join(f" {_change(before.get(key), after.get(key)):>9}" for key in ("p50_ms", "p95_ms", "p99_ms")))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("old", help="отчёт базового прогона")
+    parser.add_argument("new", help="отчёт сравниваемого прогона")
+    args = parser.parse_args()
+    with open(args.old, encoding="utf-8") as old_file, open(args.new, encoding="utf-8") as new_file:
+        compare(json.load(old_file), json.load(new_file))
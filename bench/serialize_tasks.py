@@ -0,0 +1,95 @@
+"""Скорость построения ответа со списком задач: ORM + TaskResponse на каждую задачу
+против выборки колонок и пакетного serialize_tasks.
+
+Запуск: python -m bench.serialize_tasks --rows 10000
+"""
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from models import Base, Task, User, UserRole
+from schemas import TaskPage, TaskResponse
+from serializers import TASK_COLUMNS, task_page
+from utils import calculate_days_until_deadline, calculate_urgency
+
+
+async def fill(engine, rows: int) -> None:
+    now = datetime.now(timezone.utc)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(User).values(
+            nickname="bench", email="bench@example.com", hashed_password="x", role=UserRole.USER
+        ))
+        await conn.execute(insert(Task), [
+            {
+                "title": f"Задача {i}",
+                "description": "Описание задачи для бенчмарка",
+                "is_important": random.random() < 0.5,
+                "deadline_at": now + timedelta(hours=random.randint(1, 24 * 30)),
+                "quadrant": random.choice(["Q1", "Q2", "Q3", "Q4"]),
+                "completed": random.random() < 0.3,
+                "user_id": 1,
+            }
+            for i in range(rows)
+        ])
+
+
+async def orm_path(session: AsyncSession) -> None:
+    """Прежний путь: ORM-объекты, расчёт полей и TaskResponse по одной задаче"""
+    tasks = (await session.execute(select(Task))).scalars().all()
+    items = []
+    for task in tasks:
+        items.append(TaskResponse(
+            id=task.id,
+            title=task.title,
+            description=task.description,
+            is_important=task.is_important,
+            deadline_at=task.deadline_at,
+            quadrant=task.quadrant,
+            is_urgent=calculate_urgency(task.deadline_at),
+            days_until_deadline=calculate_days_until_deadline(task.deadline_at),
+            completed=task.completed,
+            created_at=task.created_at,
+            completed_at=task.completed_at,
+        ))
+    TaskPage(items=items, next_cursor=None)
+
+
+async def row_path(session: AsyncSession) -> None:
+    """Новый путь: кортежи колонок и пакетный расчёт от одного now"""
+    rows = (await session.execute(select(*TASK_COLUMNS))).all()
+    TaskPage.model_validate(task_page(rows, None))
+
+
+async def measure(engine, fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        async with AsyncSession(engine) as session:
+            started = time.perf_counter()
+            await fn(session)
+            best = min(best, time.perf_counter() - started)
+    return best
+
+
+async def main(rows: int, repeat: int) -> None:
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    await fill(engine, rows)
+
+    for label, fn in (("ORM + TaskResponse", orm_path), ("колонки + serialize_tasks", row_path)):
+        elapsed = await measure(engine, fn, repeat)
+        print(f"{label:>26}: {elapsed * 1000:8.1f} мс, {rows / elapsed:10.0f} строк/с")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.repeat))
@@ -0,0 +1,98 @@
+"""Сравнение подсчёта /stats в Python-цикле и через GROUP BY.
+
+Запуск: python -m bench.stats_groupby --tasks 1000000 --users 100
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from models import Base, Task, User, UserRole
+
+BATCH_SIZE = 10_000
+
+
+async def fill(engine, users: int, tasks: int) -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(User), [
+            {"nickname": f"user{i}", "email": f"user{i}@example.com",
+             "hashed_password": "x", "role": UserRole.USER}
+            for i in range(1, users + 1)
+        ])
+
+        now = datetime.now(timezone.utc)
+        for start in range(0, tasks, BATCH_SIZE):
+            rows = []
+            for _ in range(min(BATCH_SIZE, tasks - start)):
+                rows.append({
+                    "title": "Задача для бенчмарка",
+                    "description": "Описание задачи " * 4,
+                    "is_important": random.random() < 0.5,
+                    "deadline_at": now + timedelta(days=random.randint(0, 30)),
+                    "quadrant": random.choice(["Q1", "Q2", "Q3", "Q4"]),
+                    "completed": random.random() < 0.3,
+                    "user_id": random.randint(1, users),
+                })
+            await conn.execute(insert(Task), rows)
+
+
+async def python_loop(session, user_id):
+    stmt = select(Task)
+    if user_id is not None:
+        stmt = stmt.where(Task.user_id == user_id)
+    tasks = (await session.execute(stmt)).all()
+    by_quadrant = {"Q1": 0, "Q2": 0, "Q3": 0, "Q4": 0}
+    for (task,) in tasks:
+        by_quadrant[task.quadrant] += 1
+    return by_quadrant
+
+
+async def group_by(session, user_id):
+    stmt = select(Task.quadrant, Task.completed, func.count()).group_by(Task.quadrant, Task.completed)
+    if user_id is not None:
+        stmt = stmt.where(Task.user_id == user_id)
+    by_quadrant = {"Q1": 0, "Q2": 0, "Q3": 0, "Q4": 0}
+    for quadrant, _, count in (await session.execute(stmt)).all():
+        by_quadrant[quadrant] += count
+    return by_quadrant
+
+
+async def measure(engine, fn, user_id, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        async with AsyncSession(engine) as session:
+            started = time.perf_counter()
+            await fn(session, user_id)
+            best = min(best, time.perf_counter() - started)
+    return best
+
+
+async def main(users: int, tasks: int, repeat: int) -> None:
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    print(f"Заполняем {path}: {users} пользователей, {tasks} задач...")
+    await fill(engine, users, tasks)
+
+    for label, user_id in (("пользователь", 1), ("администратор", None)):
+        loop_time = await measure(engine, python_loop, user_id, repeat)
+        sql_time = await measure(engine, group_by, user_id, repeat)
+        print(f"{label:>14}: python-цикл {loop_time * 1000:9.1f} мс | "
+              f"GROUP BY {sql_time * 1000:8.1f} мс | x{loop_time / sql_time:.1f}")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--tasks", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    asyncio.run(main(args.users, args.tasks, args.repeat))
@@ -0,0 +1,64 @@
+# build_static.py
+"""Сборка статики: копии файлов static/ с хэшем содержимого в имени,
+сжатые варианты .gz и .br (если установлен пакет brotli) и manifest.json
+для шаблонов. Запускается при деплое после изменения static/.
+
+Запуск: python build_static.py
+"""
+import gzip
+import hashlib
+import json
+import os
+import shutil
+
+from static_assets import DIST_DIR, MANIFEST_NAME, STATIC_DIR
+
+try:
+    import brotli
+except ImportError:  # без brotli отдаются только .gz
+    brotli = None
+
+ASSET_EXTENSIONS = (".js", ".css")
+HASH_LENGTH = 12
+
+
+def fingerprint(name: str, data: bytes) -> str:
+    stem, ext = os.path.splitext(name)
+    return f"{stem}.{hashlib.sha256(data).hexdigest()[:HASH_LENGTH]}{ext}"
+
+
+def build(directory: str = STATIC_DIR) -> dict:
+    dist = os.path.join(directory, DIST_DIR)
+    # Старые версии удаляются: ссылки на них остались только в кэше браузеров
+    shutil.rmtree(dist, ignore_errors=True)
+    os.makedirs(dist)
+
+    manifest = {}
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(ASSET_EXTENSIONS):
+            continue
+        with open(os.path.join(directory, name), "rb") as file:
+            data = file.read()
+
+        target = os.path.join(dist, fingerprint(name, data))
+        variants = {"": data, ".gz": gzip.compress(data, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            variants[".br"] = brotli.compress(data, quality=11)
+        for suffix, content in variants.items():
+            # Сжатый вариант больше исходника не нужен — его никто не выберет
+            if suffix and len(content) >= len(data):
+                continue
+            with open(target + suffix, "wb") as file:
+                file.write(content)
+
+        manifest[name] = os.path.basename(target)
+        sizes = ", ".join(f"{suffix or 'raw'} {len(content)}" for suffix, content in variants.items())
+        print(f"{name} -> {manifest[name]} ({sizes})")
+
+    with open(os.path.join(dist, MANIFEST_NAME), "w", encoding="utf-8") as file:
+        json.dump(manifest, file, indent=2, sort_keys=True)
+    return manifest
+
+
+if __name__ == "__main__":
+    build()
@@ -1,11 +1,30 @@
 # create_tables.py
+"""Привести схему БД к последней версии: то же, что alembic upgrade head.
+
+Запуск: python create_tables.py
+"""
 import asyncio
+import os
+
+from alembic import command
+from alembic.config import Config
+
 from database import engine
-from models import Base
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.abspath(__file__)), "alembic.ini")
+
+
+def _upgrade(connection) -> None:
+    config = Config(ALEMBIC_INI)
+    # env.py выполнит миграции на этом соединении, не создавая своего движка
+    config.attributes["connection"] = connection
+    command.upgrade(config, "head")
+
 
 async def create_tables():
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    async with engine.connect() as conn:
+        await conn.run_sync(_upgrade)
+        await conn.commit()
 
 if __name__ == "__main__":
     asyncio.run(create_tables())
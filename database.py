@@ -1,25 +1,146 @@
+import itertools
+import os
+import time
+from typing import Dict, Optional
+
+from dotenv import load_dotenv
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import (
     create_async_engine,
     async_sessionmaker,
+    AsyncEngine,
     AsyncSession
 )
-from sqlalchemy.orm import declarative_base
+from sqlalchemy.orm import Session, declarative_base
 
-DATABASE_URL = "sqlite+aiosqlite:///./todo.db"
+from profiling import PROFILING_ENABLED, instrument_engine
+from query_guard import QUERY_GUARD, guard_engine
 
-engine = create_async_engine(
-    DATABASE_URL,
-    echo=True
-)
+load_dotenv()
+
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./todo.db")
+# Реплики только для чтения через запятую; пусто — все запросы идут в основную БД
+DATABASE_REPLICA_URLS = [
+    url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()
+]
+# Сколько секунд после своей записи пользователь читает из основной БД
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+
+# Логирование SQL синхронно пишет каждый запрос — только для отладки
+DATABASE_ECHO = os.getenv("DATABASE_ECHO", "0") == "1"
+
+# PostgreSQL (asyncpg): пул соединений
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") == "1"
+# Кэш подготовленных выражений asyncpg; 0 — для pgbouncer в режиме transaction
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100"))
+
+# SQLite: PRAGMA, выставляемые на каждое новое соединение
+SQLITE_PRAGMAS = {
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+    "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", "-65536")),  # отрицательное — в КиБ
+    "temp_store": os.getenv("SQLITE_TEMP_STORE", "MEMORY"),
+}
+
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    for name, value in SQLITE_PRAGMAS.items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+
+def create_engine_from_env(url: str = DATABASE_URL, **kwargs) -> AsyncEngine:
+    """Создать async-движок с настройками под СУБД из DATABASE_URL"""
+    backend = make_url(url).get_backend_name()
+    options = {"echo": DATABASE_ECHO}
+
+    if backend == "postgresql":
+        options.update(
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+            pool_pre_ping=DB_POOL_PRE_PING,
+            connect_args={"statement_cache_size": DB_STATEMENT_CACHE_SIZE},
+        )
+    elif backend == "sqlite":
+        options.update(
+            connect_args={"timeout": SQLITE_PRAGMAS["busy_timeout"] / 1000},
+        )
+
+    options.update(kwargs)
+    engine = create_async_engine(url, **options)
+
+    if backend == "sqlite":
+        event.listen(engine.sync_engine, "connect", _apply_sqlite_pragmas)
+    if PROFILING_ENABLED:
+        instrument_engine(engine)
+    if QUERY_GUARD != "off":
+        guard_engine(engine)
+
+    return engine
+
+
+engine = create_engine_from_env()
 
 AsyncSessionLocal = async_sessionmaker(
     engine,
     expire_on_commit=False
 )
 
+replica_engines = [create_engine_from_env(url) for url in DATABASE_REPLICA_URLS]
+_replica_sessions = itertools.cycle([
+    async_sessionmaker(replica, expire_on_commit=False) for replica in replica_engines
+])
+
 Base = declarative_base()
 
+# user_id -> момент (time.monotonic), до которого чтения идут в основную БД.
+# Хранится в памяти процесса: при нескольких воркерах нужна липкая балансировка
+_pinned_until: Dict[int, float] = {}
+_PINNED_LIMIT = 100_000
+
+
+def pin_to_primary(user_id: int) -> None:
+    now = time.monotonic()
+    if len(_pinned_until) >= _PINNED_LIMIT:
+        for pinned_id, until in list(_pinned_until.items()):
+            if until <= now:
+                del _pinned_until[pinned_id]
+    _pinned_until[user_id] = now + READ_YOUR_WRITES_SECONDS
+
+
+def read_sessionmaker(user_id: Optional[int] = None) -> async_sessionmaker:
+    """Фабрика сессий для чтения: реплика по кругу или основная БД, если
+    реплик нет или пользователь недавно что-то записал"""
+    if not replica_engines:
+        return AsyncSessionLocal
+    if user_id is not None:
+        until = _pinned_until.get(user_id)
+        if until is not None:
+            if until > time.monotonic():
+                return AsyncSessionLocal
+            _pinned_until.pop(user_id, None)
+    return next(_replica_sessions)
+
+
+# get_current_user кладёт id пользователя в session.info; любой commit такой
+# сессии закрепляет пользователя за основной БД на READ_YOUR_WRITES_SECONDS
+@event.listens_for(Session, "after_commit")
+def _pin_writer(session) -> None:
+    user_id = session.info.get("user_id")
+    if user_id is not None and replica_engines:
+        pin_to_primary(user_id)
+
 
 async def get_async_session() -> AsyncSession:
     async with AsyncSessionLocal() as session:
-        yield session
+        yield session
\ No newline at end of file
@@ -1,34 +1,56 @@
-from fastapi import Depends, HTTPException, status
+import os
+import time
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from fastapi import Depends, HTTPException, Query, Request, Response, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from database import get_async_session
+from database import AsyncSessionLocal, get_async_session, read_sessionmaker
 from models import User, UserRole
 from auth_utils import decode_access_token
+from user_cache import user_cache
+from task_stats import read_version
+from responses import etag_matches
 from typing import Optional
 
+# is_urgent и days_until_deadline зависят от текущего момента, поэтому ETag
+# меняется не реже чем раз в ETAG_TIME_BUCKET_SECONDS даже без записей
+ETAG_TIME_BUCKET = int(os.getenv("ETAG_TIME_BUCKET_SECONDS", "60"))
+
 # OAuth2 схема для получения токена из заголовка Authorization
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v3/auth/login")
 
-#Аутентификация
-async def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: AsyncSession = Depends(get_async_session)
-    ) -> User:
-    credentials_exception = HTTPException(
+# Для потока событий: EventSource в браузере не умеет передавать заголовки,
+# поэтому токен принимается и из параметра access_token
+oauth2_scheme_optional = OAuth2PasswordBearer(tokenUrl="/api/v3/auth/login", auto_error=False)
+
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Не удалось проверить учетные данные",
         headers={"WWW-Authenticate": "Bearer"},
     )
- 
+
+
+async def _user_from_token(token: Optional[str], db: AsyncSession) -> User:
     # Декодирование токена
-    payload = decode_access_token(token)
+    payload = decode_access_token(token) if token else None
     if payload is None:
-        raise credentials_exception
+        raise _credentials_exception()
 
     user_id: Optional[int] = payload.get("sub")
     if user_id is None:
-        raise credentials_exception
+        raise _credentials_exception()
+
+    # По id в session.info commit этой сессии закрепляет чтения пользователя за основной БД
+    db.info["user_id"] = int(user_id)
+
+    # Сначала кэш: иначе каждый запрос стоит лишнего SELECT по users
+    user = user_cache.get(int(user_id))
+    if user is not None:
+        return user
 
     # Поиск пользователя в БД
     result = await db.execute(
@@ -38,9 +60,49 @@ async def get_current_user(
     user = result.scalar_one_or_none()
 
     if user is None:
-        raise credentials_exception
+        raise _credentials_exception()
+
+    return user_cache.put(user)
+
+
+#Аутентификация
+async def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_async_session)
+    ) -> User:
+    return await _user_from_token(token, db)
+
+
+# Аутентификация долгоживущего потока: сессия БД закрывается сразу после
+# проверки токена, а не держит соединение из пула всё время подключения
+async def get_stream_user(
+    token: Optional[str] = Depends(oauth2_scheme_optional),
+    access_token: Optional[str] = Query(None, description="JWT для клиентов без заголовка Authorization")
+    ) -> User:
+    async with AsyncSessionLocal() as db:
+        return await _user_from_token(token or access_token, db)
+
 
+# Пользователь, загруженный в текущую сессию БД (без кэша) — для эндпоинтов,
+# которые изменяют самого пользователя или проверяют его пароль
+async def get_current_user_for_update(
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_session)
+    ) -> User:
+    user = await db.get(User, current_user.id)
+    if user is None:
+        raise _credentials_exception()
     return user
+
+# Сессия для GET-эндпоинтов: реплика для чтения, либо основная БД, если
+# пользователь недавно выполнял запись (read-your-writes)
+async def get_read_session(
+    current_user: User = Depends(get_current_user)
+    ) -> AsyncSession:
+    async with read_sessionmaker(current_user.id)() as session:
+        yield session
+
+
 # Авторизация, возвращает объект User, асли пользователь является администратором
 
 
@@ -53,3 +115,40 @@ async def get_current_admin(
     detail="Недостаточно прав доступа"
     )
     return current_user
+
+
+# Часовой пояс пользователя для расчёта границ дней (IANA, например Europe/Moscow)
+def get_timezone(
+    tz: str = Query("UTC", description="Часовой пояс IANA, например Europe/Moscow")
+) -> ZoneInfo:
+    try:
+        return ZoneInfo(tz)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Неизвестный часовой пояс"
+        )
+
+
+# ETag списков задач и /stats/ по версии задач пользователя (user_task_stats.version).
+# Совпавший If-None-Match получает 304 после одного чтения по первичному ключу,
+# без запроса к таблице задач. Возвращает заголовки для ответа 200
+async def get_etag_headers(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_read_session),
+    current_user: User = Depends(get_current_user)
+    ) -> dict:
+    # Ответ администратору зависит от задач всех пользователей — без ETag
+    if current_user.role == UserRole.ADMIN:
+        return {}
+
+    version = await read_version(db, current_user.id)
+    etag = f'W/"{current_user.id}-{version}-{int(time.time()) // ETAG_TIME_BUCKET}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    # Для ответов через response_model (FAST_JSON_RESPONSES=0)
+    response.headers.update(headers)
+    return headers
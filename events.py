@@ -0,0 +1,229 @@
+import asyncio
+import json
+import logging
+import os
+from typing import AsyncIterator, Callable, Dict, Iterable, Optional, Set
+
+from responses import dumps
+
+try:
+    import redis.asyncio as redis
+except ImportError:  # redis — необязательная зависимость, нужна только для нескольких воркеров
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+# Пусто — события расходятся только внутри процесса; redis://... — между воркерами
+EVENT_BUS_URL = os.getenv("EVENT_BUS_URL", "")
+EVENT_BUS_CHANNEL = os.getenv("EVENT_BUS_CHANNEL", "todo:task-events")
+EVENT_QUEUE_SIZE = int(os.getenv("EVENT_QUEUE_SIZE", "100"))
+# Что делать с подписчиком, не успевающим читать: resync — сбросить очередь и
+# прислать событие resync (клиент перечитывает задачи), disconnect — закрыть поток
+EVENT_SLOW_CONSUMER_POLICY = os.getenv("EVENT_SLOW_CONSUMER_POLICY", "resync")
+# Комментарий-пинг в простаивающем потоке: не даёт прокси закрыть соединение
+# и вовремя обнаруживает отключившихся клиентов
+EVENT_KEEPALIVE_SECONDS = float(os.getenv("EVENT_KEEPALIVE_SECONDS", "15"))
+EVENT_RETRY_MS = int(os.getenv("EVENT_RETRY_MS", "3000"))
+
+# Маркер в очереди: события пропущены, клиенту нужно перечитать задачи
+RESYNC = {"type": "resync"}
+
+
+class Subscription:
+    """Ограниченная очередь событий одного подключения"""
+
+    def __init__(self, user_id: int, is_admin: bool, maxsize: int = EVENT_QUEUE_SIZE):
+        self.user_id = user_id
+        self.is_admin = is_admin
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self.closed = False
+
+    def offer(self, event: dict) -> bool:
+        """Положить событие без ожидания; False — очередь переполнена"""
+        try:
+            self.queue.put_nowait(event)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    def overflow(self, policy: str) -> None:
+        # Очередь переполнена: хранить хвост бессмысленно, клиент всё равно перечитает задачи
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        if policy == "disconnect":
+            self.closed = True
+        self.queue.put_nowait(RESYNC)
+
+    async def get(self) -> dict:
+        return await self.queue.get()
+
+
+class MemoryBackend:
+    """Доставка внутри процесса: опубликованное событие сразу уходит подписчикам"""
+
+    def __init__(self):
+        self._deliver: Optional[Callable[[dict], None]] = None
+
+    async def start(self, deliver: Callable[[dict], None]) -> None:
+        self._deliver = deliver
+
+    async def stop(self) -> None:
+        self._deliver = None
+
+    async def publish(self, event: dict) -> None:
+        if self._deliver is not None:
+            self._deliver(event)
+
+
+class RedisBackend:
+    """Доставка через Redis pub/sub: каждый воркер получает события всех остальных"""
+
+    def __init__(self, url: str, channel: str = EVENT_BUS_CHANNEL):
+        if redis is None:
+            raise RuntimeError("Для EVENT_BUS_URL нужен пакет redis")
+        self._client = redis.from_url(url)
+        self._channel = channel
+        self._listener: Optional[asyncio.Task] = None
+
+    async def start(self, deliver: Callable[[dict], None]) -> None:
+        pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+        await pubsub.subscribe(self._channel)
+        self._listener = asyncio.create_task(self._listen(pubsub, deliver))
+
+    async def _listen(self, pubsub, deliver: Callable[[dict], None]) -> None:
+        async for message in pubsub.listen():
+            try:
+                deliver(json.loads(message["data"]))
+            except Exception:
+                logger.exception("Некорректное событие в канале %s", self._channel)
+
+    async def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            self._listener = None
+        await self._client.aclose()
+
+    async def publish(self, event: dict) -> None:
+        await self._client.publish(self._channel, dumps(event))
+
+
+class EventBus:
+    """Рассылка событий задач подключённым клиентам.
+
+    Подписчики сгруппированы по пользователю; администраторы получают все события.
+    Публикация никогда не ждёт медленного клиента: при переполнении его очереди
+    срабатывает EVENT_SLOW_CONSUMER_POLICY.
+    """
+
+    def __init__(self, backend=None, policy: str = EVENT_SLOW_CONSUMER_POLICY):
+        self.backend = backend or MemoryBackend()
+        self.policy = policy
+        self._by_user: Dict[int, Set[Subscription]] = {}
+        self._admins: Set[Subscription] = set()
+        self._started = False
+
+        self.published = 0
+        self.delivered = 0
+        self.overflows = 0
+
+    async def start(self) -> None:
+        if not self._started:
+            await self.backend.start(self._deliver)
+            self._started = True
+
+    async def stop(self) -> None:
+        if self._started:
+            await self.backend.stop()
+            self._started = False
+
+    def subscribe(self, user_id: int, is_admin: bool = False) -> Subscription:
+        subscription = Subscription(user_id, is_admin)
+        if is_admin:
+            self._admins.add(subscription)
+        else:
+            self._by_user.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        if subscription.is_admin:
+            self._admins.discard(subscription)
+            return
+        subscribers = self._by_user.get(subscription.user_id)
+        if subscribers is not None:
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._by_user[subscription.user_id]
+
+    async def publish(self, event: dict) -> None:
+        """Опубликовать событие (вызывается после commit); без подписчиков почти бесплатно"""
+        await self.publish_many([event])
+
+    async def publish_many(self, events: Iterable[dict]) -> None:
+        if not self._started:
+            return
+        for event in events:
+            self.published += 1
+            try:
+                await self.backend.publish(event)
+            except Exception:
+                # Потерянное событие не должно ронять запрос, который уже закоммичен
+                logger.exception("Не удалось опубликовать событие %s", event.get("type"))
+
+    def _deliver(self, event: dict) -> None:
+        for subscription in (*self._by_user.get(event.get("user_id"), ()), *self._admins):
+            if subscription.closed:
+                continue
+            if subscription.offer(event):
+                self.delivered += 1
+            else:
+                self.overflows += 1
+                subscription.overflow(self.policy)
+
+    def metrics(self) -> dict:
+        return {
+            "backend": type(self.backend).__name__,
+            "running": self._started,
+            "subscribers": sum(len(group) for group in self._by_user.values()) + len(self._admins),
+            "published": self.published,
+            "delivered": self.delivered,
+            "overflows": self.overflows,
+        }
+
+
+task_events = EventBus(RedisBackend(EVENT_BUS_URL) if EVENT_BUS_URL else None)
+
+
+def task_event(event_type: str, user_id: int, task_id: Optional[int] = None,
+               task: Optional[dict] = None, **extra) -> dict:
+    return {"type": event_type, "user_id": user_id, "id": task_id, "task": task, **extra}
+
+
+def _sse(event: dict) -> bytes:
+    return b"event: " + event["type"].encode() + b"\ndata: " + dumps(event) + b"\n\n"
+
+
+async def sse_stream(bus: EventBus, subscription: Subscription) -> AsyncIterator[bytes]:
+    """Поток text/event-stream одной подписки; отписка при любом завершении.
+
+    Ожидающий клиент — это корутина и пустая очередь: соединение с БД не держится.
+    """
+    # Ожидание через asyncio.wait, а не wait_for: wait_for до Python 3.12 может
+    # проглотить отмену, если событие пришло одновременно с отключением клиента
+    getter: Optional[asyncio.Future] = None
+    try:
+        yield f"retry: {EVENT_RETRY_MS}\n\n".encode()
+        while True:
+            if getter is None:
+                getter = asyncio.ensure_future(subscription.get())
+            done, _ = await asyncio.wait((getter,), timeout=EVENT_KEEPALIVE_SECONDS)
+            if not done:
+                yield b": keepalive\n\n"
+                continue
+            event, getter = getter.result(), None
+            yield _sse(event)
+            if subscription.closed and subscription.queue.empty():
+                break
+    finally:
+        if getter is not None:
+            getter.cancel()
+        bus.unsubscribe(subscription)
@@ -1,18 +1,61 @@
+import os
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, Request
-from fastapi.staticfiles import StaticFiles
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.templating import Jinja2Templates
 
-from routers import auth, tasks, stats
+from routers import auth, tasks, stats, users
+from scheduler import SCHEDULER_ENABLED, urgency_scheduler
+from responses import FastJSONResponse
+from events import task_events
+from static_assets import STATIC_DIR, PrecompressedStaticFiles, static_url
+from profiling import PROFILING_ENABLED, ProfilingMiddleware, metrics_endpoint
+from query_guard import QUERY_GUARD, QueryGuardMiddleware
+
+# Сжатие ответов API (большие списки задач, выгрузка). Уровень 6 почти не уступает 9
+# по размеру JSON, но заметно дешевле по CPU; SSE и уже сжатые файлы не трогаются
+GZIP_MINIMUM_SIZE = int(os.getenv("GZIP_MINIMUM_SIZE", "1024"))
+GZIP_COMPRESS_LEVEL = int(os.getenv("GZIP_COMPRESS_LEVEL", "6"))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Фоновый перенос задач в срочные квадранты по наступлении urgent_from
+    if SCHEDULER_ENABLED:
+        urgency_scheduler.start()
+    # Рассылка событий задач подписчикам /tasks/stream
+    await task_events.start()
+    yield
+    await task_events.stop()
+    await urgency_scheduler.stop()
+
+
+app = FastAPI(
+    title="ToDo Web App",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
+)
 
-app = FastAPI(title="ToDo Web App")
+app.add_middleware(GZipMiddleware, minimum_size=GZIP_MINIMUM_SIZE, compresslevel=GZIP_COMPRESS_LEVEL)
+# PROFILING_ENABLED=1: метрики запросов по маршрутам в /metrics и выборочные профили
+if PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+    app.add_route("/metrics", metrics_endpoint, include_in_schema=False)
+# QUERY_GUARD=log|raise (разработка и тесты): бюджет запросов к БД, N+1 и полные просмотры
+if QUERY_GUARD != "off":
+    app.add_middleware(QueryGuardMiddleware)
 
 app.include_router(auth.router)
 app.include_router(tasks.router)
 app.include_router(stats.router)
+app.include_router(users.router)
 
-app.mount("/static", StaticFiles(directory="static"), name="static")
+app.mount("/static", PrecompressedStaticFiles(directory=STATIC_DIR), name="static")
 
 templates = Jinja2Templates(directory="templates")
+# {{ static_url('tasks.js') }} — имя с хэшем после python build_static.py
+templates.env.globals["static_url"] = static_url
 
 
 @app.get("/")
@@ -0,0 +1,71 @@
+import asyncio
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import pool
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from database import DATABASE_URL
+from models import Base
+
+config = context.config
+target_metadata = Base.metadata
+
+# Объекты полнотекстового поиска создаются DDL из search.py и не описаны в моделях —
+# autogenerate не должен предлагать их удалить
+SEARCH_OBJECTS = {"tasks_fts", "search_vector", "ix_tasks_search_vector"}
+
+
+def include_object(obj, name, type_, reflected, compare_to) -> bool:
+    return not (name in SEARCH_OBJECTS or (type_ == "table" and name.startswith("tasks_fts_")))
+
+
+def _configure(**kwargs) -> None:
+    context.configure(
+        target_metadata=target_metadata,
+        include_object=include_object,
+        **kwargs,
+    )
+
+
+def run_migrations_offline() -> None:
+    """SQL-скрипт вместо подключения: alembic upgrade head --sql"""
+    _configure(url=_url(), literal_binds=True, dialect_opts={"paramstyle": "named"})
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def do_run_migrations(connection) -> None:
+    # SQLite не умеет большинство ALTER TABLE — batch-режим пересоздаёт таблицу
+    _configure(connection=connection, render_as_batch=connection.dialect.name == "sqlite")
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def _url() -> str:
+    # alembic -x url=... перекрывает DATABASE_URL
+    return context.get_x_argument(as_dictionary=True).get("url", DATABASE_URL)
+
+
+async def run_async_migrations() -> None:
+    engine = create_async_engine(_url(), poolclass=pool.NullPool)
+    async with engine.connect() as connection:
+        await connection.run_sync(do_run_migrations)
+    await engine.dispose()
+
+
+def run_migrations_online() -> None:
+    # create_tables._upgrade (из create_tables()) передаёт уже открытое соединение
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        do_run_migrations(connection)
+        return
+    if config.config_file_name is not None:
+        fileConfig(config.config_file_name)
+    asyncio.run(run_async_migrations())
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,64 @@
+"""Общие операции миграций.
+
+Базы, созданные до миграций через create_tables.py, могут уже содержать часть
+объектов, поэтому операции пропускают существующие таблицы, колонки и индексы.
+Индексы в PostgreSQL строятся CONCURRENTLY вне транзакции, без блокировки записи.
+В режиме alembic upgrade --sql базы нет, и объекты считаются отсутствующими.
+"""
+from typing import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+
+def _offline() -> bool:
+    return op.get_context().as_sql
+
+
+def _inspector():
+    return sa.inspect(op.get_bind())
+
+
+def _is_postgres() -> bool:
+    return op.get_bind().dialect.name == "postgresql"
+
+
+def has_table(table: str) -> bool:
+    if _offline():
+        return False
+    return _inspector().has_table(table)
+
+
+def has_column(table: str, column: str) -> bool:
+    if _offline():
+        return False
+    return column in {info["name"] for info in _inspector().get_columns(table)}
+
+
+def has_index(table: str, name: str) -> bool:
+    if _offline():
+        return False
+    return name in {info["name"] for info in _inspector().get_indexes(table)}
+
+
+def create_index(name: str, table: str, columns: Sequence[str], **kwargs) -> None:
+    if has_index(table, name):
+        return
+    if _is_postgres():
+        # CREATE INDEX CONCURRENTLY нельзя выполнять в транзакции
+        with op.get_context().autocommit_block():
+            op.create_index(name, table, columns, postgresql_concurrently=True, **kwargs)
+    else:
+        op.create_index(name, table, columns, **kwargs)
+
+
+def drop_index(name: str, table: str) -> None:
+    # Без базы неизвестно, какие индексы в ней есть: IF EXISTS
+    offline = _offline()
+    if not offline and not has_index(table, name):
+        return
+    if _is_postgres():
+        with op.get_context().autocommit_block():
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=offline or None)
+    else:
+        op.drop_index(name, table_name=table, if_exists=offline or None)
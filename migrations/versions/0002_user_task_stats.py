@@ -0,0 +1,52 @@
+"""Материализованные счётчики задач user_task_stats
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from migrations.helpers import has_table
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+tasks = sa.table(
+    "tasks",
+    sa.column("user_id", sa.Integer),
+    sa.column("quadrant", sa.String),
+    sa.column("completed", sa.Boolean),
+)
+
+
+def _count(condition):
+    return sa.func.coalesce(sa.func.sum(sa.case((condition, 1), else_=0)), 0)
+
+
+def upgrade() -> None:
+    if has_table("user_task_stats"):
+        return
+    stats = op.create_table(
+        "user_task_stats",
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
+        *[sa.Column(name, sa.Integer(), nullable=False)
+          for name in ("total", "q1", "q2", "q3", "q4", "completed", "pending")],
+    )
+    # Счётчики для уже существующих задач — тот же GROUP BY, что в task_stats.count_tasks
+    op.execute(stats.insert().from_select(
+        ["user_id", "total", "q1", "q2", "q3", "q4", "completed", "pending"],
+        sa.select(
+            tasks.c.user_id,
+            sa.func.count(),
+            *[_count(tasks.c.quadrant == quadrant) for quadrant in ("Q1", "Q2", "Q3", "Q4")],
+            _count(tasks.c.completed == sa.true()),
+            _count(tasks.c.completed == sa.false()),
+        ).group_by(tasks.c.user_id)
+    ))
+
+
+def downgrade() -> None:
+    op.drop_table("user_task_stats")
@@ -0,0 +1,42 @@
+"""Полнотекстовый индекс задач (FTS5 в SQLite, tsvector + GIN в PostgreSQL)
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+from search import POSTGRES_SEARCH_DDL, SQLITE_FTS_TABLE, SQLITE_FTS_TRIGGERS, create_search_index
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # DDL идемпотентен и при создании индекса над заполненной таблицей индексирует её.
+    # В PostgreSQL добавление генерируемой колонки перезаписывает таблицу под блокировкой
+    if not op.get_context().as_sql:
+        create_search_index(op.get_bind())
+        return
+
+    # alembic upgrade --sql: те же выражения, что выполняет create_search_index
+    if op.get_bind().dialect.name == "sqlite":
+        for statement in (SQLITE_FTS_TABLE, *SQLITE_FTS_TRIGGERS,
+                          "INSERT INTO tasks_fts(tasks_fts) VALUES ('rebuild')"):
+            op.execute(statement)
+    else:
+        for statement in POSTGRES_SEARCH_DDL:
+            op.execute(statement)
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite":
+        for trigger in ("tasks_fts_ai", "tasks_fts_ad", "tasks_fts_au"):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS tasks_fts")
+    elif dialect == "postgresql":
+        op.execute("DROP INDEX IF EXISTS ix_tasks_search_vector")
+        op.execute("ALTER TABLE tasks DROP COLUMN IF EXISTS search_vector")
@@ -0,0 +1,65 @@
+"""Колонка tasks.urgent_from с заполнением для существующих задач
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from datetime import timedelta
+
+from alembic import op
+import sqlalchemy as sa
+
+from migrations.helpers import has_column
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+# utils.URGENCY_WINDOW на момент миграции: миграция не должна меняться вместе с кодом
+URGENCY_WINDOW = timedelta(days=4)
+BATCH_SIZE = 10_000
+
+tasks = sa.table(
+    "tasks",
+    sa.column("id", sa.Integer),
+    sa.column("deadline_at", sa.DateTime(timezone=True)),
+    sa.column("urgent_from", sa.DateTime(timezone=True)),
+)
+
+
+def upgrade() -> None:
+    if not has_column("tasks", "urgent_from"):
+        op.add_column("tasks", sa.Column("urgent_from", sa.DateTime(timezone=True), nullable=True))
+
+    if op.get_context().as_sql:
+        # alembic upgrade --sql: пройти пачками без соединения нельзя — одно UPDATE (PostgreSQL)
+        op.execute(
+            f"UPDATE tasks SET urgent_from = deadline_at - INTERVAL '{URGENCY_WINDOW.days} days' "
+            "WHERE deadline_at IS NOT NULL AND urgent_from IS NULL"
+        )
+        return
+
+    # Пачками по id, чтобы не держать в памяти всю таблицу; арифметика над датами
+    # в Python одинакова для SQLite (строки) и PostgreSQL (timestamptz)
+    connection = op.get_bind()
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select(tasks.c.id, tasks.c.deadline_at)
+            .where(tasks.c.id > last_id, tasks.c.deadline_at.isnot(None), tasks.c.urgent_from.is_(None))
+            .order_by(tasks.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        connection.execute(
+            tasks.update().where(tasks.c.id == sa.bindparam("task_id")),
+            [{"task_id": row.id, "urgent_from": row.deadline_at - URGENCY_WINDOW} for row in rows],
+        )
+        last_id = rows[-1].id
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("tasks") as batch:
+        batch.drop_column("urgent_from")
@@ -0,0 +1,43 @@
+"""Версии задач для ETag и синхронизации: change_seq, version, task_tombstones
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from migrations.helpers import has_column, has_table
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # server_default заполняет существующие строки нулём: их изменения уже «были до» любого токена
+    if not has_column("user_task_stats", "version"):
+        op.add_column("user_task_stats",
+                      sa.Column("version", sa.BigInteger(), nullable=False, server_default="0"))
+    if not has_column("tasks", "change_seq"):
+        op.add_column("tasks", sa.Column("change_seq", sa.BigInteger(), nullable=False, server_default="0"))
+
+    if not has_table("task_tombstones"):
+        op.create_table(
+            "task_tombstones",
+            sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+            sa.Column("task_id", sa.Integer(), nullable=False),
+            sa.Column("change_seq", sa.BigInteger(), nullable=False),
+            sa.Column("deleted_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        )
+        op.create_index("ix_task_tombstones_user_change_seq", "task_tombstones", ["user_id", "change_seq"])
+
+
+def downgrade() -> None:
+    op.drop_table("task_tombstones")
+    with op.batch_alter_table("tasks") as batch:
+        batch.drop_column("change_seq")
+    with op.batch_alter_table("user_task_stats") as batch:
+        batch.drop_column("version")
@@ -0,0 +1,63 @@
+"""Составные и частичные индексы задач под фильтры роутеров tasks и stats
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+"""
+import sqlalchemy as sa
+
+from migrations.helpers import create_index, drop_index
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+# completed = 0 в SQLite и completed = false в PostgreSQL — так же, как их пишет
+# SQLAlchemy в запросах, иначе SQLite не сопоставит запрос с частичным индексом
+PENDING_WITH_DEADLINE = sa.and_(sa.column("completed", sa.Boolean) == sa.false(),
+                                sa.column("deadline_at").isnot(None))
+PARTIAL = {"sqlite_where": PENDING_WITH_DEADLINE, "postgresql_where": PENDING_WITH_DEADLINE}
+
+# (имя, колонки, параметры) — как в Task.__table_args__
+INDEXES = [
+    ("ix_tasks_user_id_id", ["user_id", "id"], {}),
+    ("ix_tasks_user_quadrant_id", ["user_id", "quadrant", "id"], {}),
+    ("ix_tasks_user_completed_id", ["user_id", "completed", "id"], {}),
+    ("ix_tasks_user_pending_deadline", ["user_id", "deadline_at", "id"], PARTIAL),
+    ("ix_tasks_pending_deadline", ["deadline_at", "id"], PARTIAL),
+    ("ix_tasks_user_quadrant_completed", ["user_id", "quadrant", "completed"], {}),
+    ("ix_tasks_user_quadrant_urgent_from", ["user_id", "quadrant", "urgent_from"], {}),
+    ("ix_tasks_quadrant_urgent_from", ["quadrant", "urgent_from"], {}),
+    ("ix_tasks_user_change_seq_id", ["user_id", "change_seq", "id"], {}),
+]
+
+# Индекс из 0001, который заменяет префикс ix_tasks_user_id_id. downgrade() его возвращает
+SUPERSEDED = [
+    ("ix_tasks_user_id", ["user_id"]),
+]
+# Индексы баз, созданных до миграций: одноколоночные из recreate_tables.py и полные
+# индексы по дедлайну из create_tables.py. Удаляются, если есть; downgrade() их не
+# возвращает — в базе, собранной миграциями 0001–0005, их нет
+LEGACY = [
+    "idx_tasks_quadrant",
+    "idx_tasks_completed",
+    "idx_tasks_deadline",
+    "ix_tasks_user_deadline_id",
+    "ix_tasks_user_completed_deadline_id",
+]
+
+
+def upgrade() -> None:
+    # Сначала новые индексы, потом удаление старых: запросы не остаются без индекса
+    for name, columns, options in INDEXES:
+        create_index(name, "tasks", columns, **options)
+    for name in [name for name, _ in SUPERSEDED] + LEGACY:
+        drop_index(name, "tasks")
+
+
+def downgrade() -> None:
+    for name, columns in SUPERSEDED:
+        create_index(name, "tasks", columns)
+    for name, _, _ in INDEXES:
+        drop_index(name, "tasks")
@@ -0,0 +1,64 @@
+"""Идентификаторы задач не переиспользуются: AUTOINCREMENT в SQLite
+
+Без AUTOINCREMENT SQLite отдаёт новой задаче id удалённой задачи с наибольшим id,
+и /tasks/changes возвращал один id и в items, и в deleted.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from search import SQLITE_FTS_TRIGGERS, create_search_index
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def _copy_from():
+    # alembic upgrade --sql: базы нет, структура таблицы — как в модели на момент миграции
+    from models import Task
+    return Task.__table__.to_metadata(sa.MetaData())
+
+
+def _rebuild_tasks(autoincrement: bool) -> None:
+    """Пересоздать таблицу tasks в SQLite с данными, индексами и триггерами поиска"""
+    kwargs = {"copy_from": _copy_from()} if op.get_context().as_sql else {}
+    with op.batch_alter_table("tasks", recreate="always",
+                              table_kwargs={"sqlite_autoincrement": autoincrement}, **kwargs):
+        pass
+    # Триггеры FTS удаляются вместе со старой таблицей; rowid задач сохранены,
+    # поэтому сам индекс tasks_fts остаётся верным
+    if op.get_context().as_sql:
+        for trigger in SQLITE_FTS_TRIGGERS:
+            op.execute(trigger)
+    else:
+        create_search_index(op.get_bind())
+
+
+def upgrade() -> None:
+    # Отметки, чей id уже занят новой задачей, старше этой задачи — клиенту она нужна живой
+    op.execute("DELETE FROM task_tombstones WHERE task_id IN (SELECT id FROM tasks)")
+    if op.get_bind().dialect.name != "sqlite":
+        # В PostgreSQL id выдаёт последовательность, и он не переиспользуется
+        return
+
+    _rebuild_tasks(autoincrement=True)
+    # Копирование строк подняло счётчик до наибольшего живого id, а удалённые
+    # задачи могли иметь id больше — их тоже нельзя выдавать повторно
+    op.execute(
+        "INSERT INTO sqlite_sequence (name, seq) SELECT 'tasks', 0 "
+        "WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = 'tasks')"
+    )
+    op.execute(
+        "UPDATE sqlite_sequence SET seq = max(seq, (SELECT coalesce(max(task_id), 0) FROM task_tombstones)) "
+        "WHERE name = 'tasks'"
+    )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "sqlite":
+        _rebuild_tasks(autoincrement=False)
@@ -1,5 +1,7 @@
 from database import Base
 from models.task import Task
 from models.user import User, UserRole
+from models.user_task_stats import UserTaskStats
+from models.task_tombstone import TaskTombstone
 
-__all__ = ["Base","Task","User","UserRole"]
\ No newline at end of file
+__all__ = ["Base","Task","User","UserRole","UserTaskStats","TaskTombstone"]
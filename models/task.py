@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey
+from sqlalchemy import BigInteger, Column, Integer, String, Boolean, DateTime, Text, ForeignKey, Index, and_
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from database import Base
@@ -11,17 +11,51 @@ class Task(Base):
     description = Column(Text, nullable=True)
     is_important = Column(Boolean, nullable=False, default=False)
     deadline_at = Column(DateTime(timezone=True), nullable=True)
+    # deadline_at - URGENCY_WINDOW: после этого момента задача срочная (см. utils.calculate_urgent_from)
+    urgent_from = Column(DateTime(timezone=True), nullable=True)
     quadrant = Column(String(2), nullable=False)
     completed = Column(Boolean, nullable=False, default=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     completed_at = Column(DateTime(timezone=True), nullable=True)
-    user_id = Column(Integer,ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
+    # Отдельный индекс по user_id не нужен: его заменяет префикс ix_tasks_user_id_id
+    user_id = Column(Integer,ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    # Версия задач пользователя (user_task_stats.version), в которой задача последний раз изменена
+    change_seq = Column(BigInteger, nullable=False, default=0, server_default="0")
 
     owner = relationship(
         "User",
         back_populates="tasks"
    )
 
+    # Условие частичных индексов; запрос использует их, только если в нём есть
+    # completed = false и сравнение deadline_at (из него следует IS NOT NULL)
+    pending_with_deadline = and_(completed == False, deadline_at.isnot(None))
+
+    # Составные индексы под keyset-пагинацию списков: фильтр + (ключ сортировки, id)
+    __table_args__ = (
+        Index("ix_tasks_user_id_id", "user_id", "id"),
+        Index("ix_tasks_user_quadrant_id", "user_id", "quadrant", "id"),
+        Index("ix_tasks_user_completed_id", "user_id", "completed", "id"),
+        # Окна по дедлайну среди невыполненных (/tasks/today, /tasks/due, /stats/deadlines):
+        # частичные индексы хранят только невыполненные задачи с дедлайном
+        Index("ix_tasks_user_pending_deadline", "user_id", "deadline_at", "id",
+              sqlite_where=pending_with_deadline, postgresql_where=pending_with_deadline),
+        # То же для администратора — без фильтра по пользователю
+        Index("ix_tasks_pending_deadline", "deadline_at", "id",
+              sqlite_where=pending_with_deadline, postgresql_where=pending_with_deadline),
+        # Покрывающий индекс для GROUP BY quadrant, completed в /stats
+        Index("ix_tasks_user_quadrant_completed", "user_id", "quadrant", "completed"),
+        # Диапазонные запросы по urgent_from: квадрант на момент запроса и задачи, ставшие срочными
+        Index("ix_tasks_user_quadrant_urgent_from", "user_id", "quadrant", "urgent_from"),
+        Index("ix_tasks_quadrant_urgent_from", "quadrant", "urgent_from"),
+        # Инкрементальная синхронизация: изменения после (change_seq, id)
+        Index("ix_tasks_user_change_seq_id", "user_id", "change_seq", "id"),
+        # Без AUTOINCREMENT SQLite переиспользует id удалённой задачи, и её отметка
+        # об удалении в /tasks/changes относилась бы к новой задаче
+        {"sqlite_autoincrement": True},
+    )
+    del pending_with_deadline
+
 
 
     def __repr__(self) -> str:
@@ -34,9 +68,11 @@ class Task(Base):
             "description": self.description,
             "is_important": self.is_important,
             "deadline_at": self.deadline_at,
+            "urgent_from": self.urgent_from,
             "quadrant": self.quadrant,
             "completed": self.completed,
             "created_at": self.created_at,
             "completed_at": self.completed_at,
-            "user_id": self.user_id
+            "user_id": self.user_id,
+            "change_seq": self.change_seq
         }
\ No newline at end of file
@@ -0,0 +1,21 @@
+from sqlalchemy import BigInteger, Column, DateTime, ForeignKey, Index, Integer
+from sqlalchemy.sql import func
+from database import Base
+
+class TaskTombstone(Base):
+    """Отметка об удалённой задаче для инкрементальной синхронизации (/tasks/changes)"""
+    __tablename__ = "task_tombstones"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    task_id = Column(Integer, nullable=False)
+    # Версия задач пользователя, в которой задача удалена (см. Task.change_seq)
+    change_seq = Column(BigInteger, nullable=False)
+    deleted_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        Index("ix_task_tombstones_user_change_seq", "user_id", "change_seq"),
+    )
+
+    def __repr__(self) -> str:
+        return f"<TaskTombstone(task_id={self.task_id}, change_seq={self.change_seq})>"
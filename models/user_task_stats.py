@@ -0,0 +1,20 @@
+from sqlalchemy import BigInteger, Column, Integer, ForeignKey
+from database import Base
+
+class UserTaskStats(Base):
+    """Материализованные счётчики задач пользователя (обновляются в одной транзакции с задачами)"""
+    __tablename__ = "user_task_stats"
+
+    user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    total = Column(Integer, nullable=False, default=0)
+    q1 = Column(Integer, nullable=False, default=0)
+    q2 = Column(Integer, nullable=False, default=0)
+    q3 = Column(Integer, nullable=False, default=0)
+    q4 = Column(Integer, nullable=False, default=0)
+    completed = Column(Integer, nullable=False, default=0)
+    pending = Column(Integer, nullable=False, default=0)
+    # Растёт при каждой записи задач пользователя; из неё строится ETag списков и /stats
+    version = Column(BigInteger, nullable=False, default=0, server_default="0")
+
+    def __repr__(self) -> str:
+        return f"<UserTaskStats(user_id={self.user_id}, total={self.total})>"
@@ -0,0 +1,59 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import DateTime, and_, or_
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Упаковать ключ сортировки последней строки страницы в непрозрачный курсор"""
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, columns: Sequence) -> List[Any]:
+    """Распаковать курсор обратно в значения колонок сортировки"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError("cursor shape mismatch")
+        return [
+            datetime.fromisoformat(value) if isinstance(column.type, DateTime) else value
+            for column, value in zip(columns, values)
+        ]
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Некорректный курсор"
+        )
+
+
+def keyset_filter(columns: Sequence, values: Sequence[Any]):
+    """Условие (a, b, ...) > (x, y, ...), записанное так, чтобы его понимал индекс"""
+    condition = columns[-1] > values[-1]
+    for column, value in zip(reversed(columns[:-1]), reversed(values[:-1])):
+        condition = or_(column > value, and_(column == value, condition))
+    return condition
+
+
+def paginate(stmt, columns: Sequence, limit: int, cursor: Optional[str]):
+    """Добавить к запросу keyset-фильтр, сортировку и LIMIT (+1 строка для проверки следующей страницы)"""
+    if cursor:
+        stmt = stmt.where(keyset_filter(columns, decode_cursor(cursor, columns)))
+    return stmt.order_by(*columns).limit(limit + 1)
+
+
+def split_page(rows: Sequence, limit: int, key: Callable[[Any], Tuple]) -> Tuple[List, Optional[str]]:
+    """Отрезать лишнюю строку и построить курсор следующей страницы"""
+    rows = list(rows)
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(key(rows[-1]))
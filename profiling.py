@@ -0,0 +1,277 @@
+import cProfile
+import io
+import itertools
+import logging
+import os
+import pstats
+import re
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    from pyinstrument import Profiler
+except ImportError:  # pyinstrument необязателен, без него отчёт строит cProfile
+    Profiler = None
+
+logger = logging.getLogger(__name__)
+
+# Инструментирование выключено по умолчанию: без него нет ни middleware, ни событий движка
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "0") == "1"
+# Профилировать каждый N-й запрос (0 — только запросы с заголовком X-Profile)
+PROFILE_SAMPLE_EVERY = int(os.getenv("PROFILE_SAMPLE_EVERY", "0"))
+# Если задан, X-Profile должен содержать этот токен — иначе профиль может заказать кто угодно
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_HEADER = b"x-profile"
+
+TIME_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100, 500, 1000, 5000)
+
+
+class RequestProfile:
+    """Счётчики одного запроса; доступны коду запроса через contextvar"""
+
+    __slots__ = ("db_seconds", "queries", "rows", "serialize_seconds", "bcrypt_seconds")
+
+    def __init__(self):
+        self.db_seconds = 0.0
+        self.queries = 0
+        self.rows = 0
+        self.serialize_seconds = 0.0
+        self.bcrypt_seconds = 0.0
+
+
+_current: ContextVar[Optional[RequestProfile]] = ContextVar("request_profile", default=None)
+
+
+def record_serialize(rows: int, seconds: float) -> None:
+    """Строки задач, превращённые в ответ, и время на это (serializers, рендер JSON)"""
+    profile = _current.get()
+    if profile is not None:
+        profile.rows += rows
+        profile.serialize_seconds += seconds
+
+
+def record_bcrypt(seconds: float) -> None:
+    profile = _current.get()
+    if profile is not None:
+        profile.bcrypt_seconds += seconds
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}"
+
+
+class Histogram:
+    """Гистограмма в формате Prometheus: по серии на набор значений меток"""
+
+    def __init__(self, name: str, documentation: str, buckets: Sequence[float],
+                 labelnames: Sequence[str] = ("method", "route")):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self.labelnames = tuple(labelnames)
+        # значения меток -> [число наблюдений по корзинам (без накопления)..., сумма, количество]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, labels: Tuple[str, ...], value: float) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for labels, series in sorted(self._series.items()):
+            cumulative = 0
+            for bound, observed in zip((*self.buckets, "+Inf"), series):
+                cumulative += observed
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {series[-2]}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {series[-1]}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str]):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], int] = {}
+
+    def inc(self, labels: Tuple[str, ...]) -> None:
+        self._values[labels] = self._values.get(labels, 0) + 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+REQUESTS = Counter("http_requests_total", "Запросы по маршруту и коду ответа", ("method", "route", "status"))
+REQUEST_SECONDS = Histogram("http_request_duration_seconds", "Полное время запроса", TIME_BUCKETS)
+DB_SECONDS = Histogram("http_request_db_seconds", "Время запросов к БД за запрос", TIME_BUCKETS)
+DB_QUERIES = Histogram("http_request_db_queries", "Число запросов к БД за запрос", COUNT_BUCKETS)
+ROWS = Histogram("http_request_rows", "Строк задач, отданных в ответ", COUNT_BUCKETS)
+SERIALIZE_SECONDS = Histogram("http_request_serialize_seconds", "Время сериализации ответа", TIME_BUCKETS)
+BCRYPT_SECONDS = Histogram("http_request_bcrypt_seconds", "Время bcrypt за запрос", TIME_BUCKETS)
+METRICS = (REQUESTS, REQUEST_SECONDS, DB_SECONDS, DB_QUERIES, ROWS, SERIALIZE_SECONDS, BCRYPT_SECONDS)
+
+
+def render_metrics() -> str:
+    return "\n".join(line for metric in METRICS for line in metric.render()) + "\n"
+
+
+async def metrics_endpoint(request: Request) -> PlainTextResponse:
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    profile = _current.get()
+    if profile is not None:
+        profile.queries += 1
+        profile.db_seconds += elapsed
+
+
+def instrument_engine(engine) -> None:
+    """Считать время и число запросов к БД в RequestProfile текущего запроса"""
+    event.listen(engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def _route_label(scope: Scope) -> str:
+    # Шаблон маршрута (/tasks/{task_id}), а не путь: иначе число серий растёт с числом задач
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    return scope.get("root_path") or "unmatched"
+
+
+class _Sampler:
+    """Отчёт профилировщика по одному запросу: pyinstrument, если установлен, иначе cProfile"""
+
+    extension = ".html" if Profiler is not None else ".txt"
+
+    def __init__(self):
+        if Profiler is not None:
+            self._profiler = Profiler(async_mode="enabled")
+            self._profiler.start()
+        else:
+            # cProfile видит весь поток, поэтому в отчёт попадают и параллельные запросы
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+    def stop(self, path: str) -> None:
+        if Profiler is not None:
+            self._profiler.stop()
+            report = self._profiler.output_html()
+        else:
+            self._profiler.disable()
+            stream = io.StringIO()
+            pstats.Stats(self._profiler, stream=stream).sort_stats("cumulative").print_stats(60)
+            report = stream.getvalue()
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(report)
+
+
+class ProfilingMiddleware:
+    """Метрики каждого запроса по шаблону маршрута и профиль выборочных запросов.
+
+    Профилируемый запрос получает заголовок X-Profile-Report с путём к отчёту.
+    """
+
+    def __init__(self, app: ASGIApp, sample_every: int = PROFILE_SAMPLE_EVERY,
+                 token: str = PROFILE_TOKEN, directory: str = PROFILE_DIR):
+        self.app = app
+        self.sample_every = sample_every
+        self.token = token
+        self.directory = directory
+        self._requests = itertools.count(1)
+        # Профилировщик один на поток: пока идёт один профиль, другие запросы не профилируются
+        self._sampling = False
+
+    def _wants_profile(self, scope: Scope) -> bool:
+        if self._sampling:
+            return False
+        if self.sample_every and next(self._requests) % self.sample_every == 0:
+            return True
+        for name, value in scope["headers"]:
+            if name == PROFILE_HEADER:
+                return not self.token or value.decode("latin-1") == self.token
+        return False
+
+    def _report_path(self, scope: Scope) -> str:
+        slug = re.sub(r"\W+", "_", _route_label(scope)).strip("_") or "root"
+        name = f"{int(time.time() * 1000)}-{scope['method']}-{slug}{_Sampler.extension}"
+        return os.path.join(self.directory, name)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] == "/metrics":
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile()
+        token = _current.set(profile)
+        status_code = 500
+        sampler, report_path = None, None
+        if self._wants_profile(scope):
+            self._sampling = True
+            os.makedirs(self.directory, exist_ok=True)
+            sampler = _Sampler()
+
+        async def send_with_report(message: Message) -> None:
+            nonlocal status_code, report_path
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if sampler is not None:
+                    # Маршрут уже найден, поэтому имя отчёта содержит его шаблон
+                    report_path = self._report_path(scope)
+                    message["headers"] = [*message.get("headers", []),
+                                          (b"x-profile-report", report_path.encode())]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_report)
+        finally:
+            elapsed = time.perf_counter() - started
+            _current.reset(token)
+            if sampler is not None:
+                try:
+                    report_path = report_path or self._report_path(scope)
+                    sampler.stop(report_path)
+                    logger.info("Профиль запроса %s %s: %s", scope["method"], scope["path"], report_path)
+                finally:
+                    self._sampling = False
+
+            labels = (scope["method"], _route_label(scope))
+            REQUESTS.inc((*labels, str(status_code)))
+            REQUEST_SECONDS.observe(labels, elapsed)
+            DB_SECONDS.observe(labels, profile.db_seconds)
+            DB_QUERIES.observe(labels, profile.queries)
+            ROWS.observe(labels, profile.rows)
+            SERIALIZE_SECONDS.observe(labels, profile.serialize_seconds)
+            BCRYPT_SECONDS.observe(labels, profile.bcrypt_seconds)
@@ -0,0 +1,51 @@
+from datetime import datetime
+from typing import Dict, Optional
+
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import Task
+from utils import URGENT_QUADRANTS
+
+# Обратное соответствие: срочный квадрант -> несрочный, из которого в него «перетекают» задачи
+_NOT_URGENT_SOURCE = {urgent: source for source, urgent in URGENT_QUADRANTS.items()}
+
+
+def quadrant_condition(quadrant: str, now: datetime):
+    """SQL-условие «задача в квадранте на момент now».
+
+    Сохранённый квадрант Q2/Q4 устаревает, когда наступает urgent_from, поэтому такие
+    задачи относятся к Q1/Q3 диапазонным условием по индексу (quadrant, urgent_from),
+    без пересчёта каждой строки.
+    """
+    if quadrant in _NOT_URGENT_SOURCE:
+        source = _NOT_URGENT_SOURCE[quadrant]
+        return or_(
+            Task.quadrant == quadrant,
+            and_(Task.quadrant == source, Task.urgent_from < now)
+        )
+    return and_(
+        Task.quadrant == quadrant,
+        or_(Task.urgent_from.is_(None), Task.urgent_from >= now)
+    )
+
+
+async def count_became_urgent(db: AsyncSession, user_id: Optional[int], now: datetime) -> Dict[str, int]:
+    """Сколько задач с сохранённым Q2/Q4 уже стали срочными: {"Q2": n, "Q4": m}"""
+    stmt = select(Task.quadrant, func.count()).where(
+        Task.quadrant.in_(URGENT_QUADRANTS.keys()),
+        Task.urgent_from < now
+    ).group_by(Task.quadrant)
+    if user_id is not None:
+        stmt = stmt.where(Task.user_id == user_id)
+
+    return {quadrant: tasks_count for quadrant, tasks_count in (await db.execute(stmt)).all()}
+
+
+def shift_quadrant_counters(counters: Dict[str, int], became_urgent: Dict[str, int]) -> Dict[str, int]:
+    """Перенести в счётчиках задачи, ставшие срочными, из Q2/Q4 в Q1/Q3"""
+    counters = dict(counters)
+    for source, tasks_count in became_urgent.items():
+        counters[source.lower()] -= tasks_count
+        counters[URGENT_QUADRANTS[source].lower()] += tasks_count
+    return counters
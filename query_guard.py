@@ -0,0 +1,167 @@
+import logging
+import os
+import re
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional
+
+from sqlalchemy import event
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+# Сторож запросов к БД для разработки и тестов: off — выключен, log — пишет
+# предупреждения, raise — роняет запрос исключением QueryBudgetExceeded
+QUERY_GUARD = os.getenv("QUERY_GUARD", "off")
+# Сколько запросов к БД допустимо за один HTTP-запрос
+QUERY_BUDGET = int(os.getenv("QUERY_BUDGET", "30"))
+# Сколько раз за HTTP-запрос допустимо выполнить запрос одной формы (N+1)
+QUERY_REPEAT_LIMIT = int(os.getenv("QUERY_REPEAT_LIMIT", "5"))
+# Пути, где число запросов законно растёт с объёмом данных (импорт пишет пачками)
+QUERY_GUARD_EXEMPT = {
+    path.strip() for path in os.getenv("QUERY_GUARD_EXEMPT", "/tasks/import").split(",") if path.strip()
+}
+
+# Таблицы, полный просмотр которых считается регрессией
+WATCHED_TABLES = ("tasks", "users")
+
+_COUNTED = re.compile(r"^\s*(select|insert|update|delete|with)\b", re.IGNORECASE)
+_EXPLAINED = re.compile(r"^\s*(select|update|delete|with)\b", re.IGNORECASE)
+_WATCHED = re.compile(r"\b(" + "|".join(WATCHED_TABLES) + r")\b", re.IGNORECASE)
+# SQLite: "SCAN tasks" или "SCAN tasks_1" (алиас SQLAlchemy) без индекса
+_SQLITE_SCAN = re.compile(r"^SCAN (" + "|".join(WATCHED_TABLES) + r")(_\d+)?$")
+# PostgreSQL: "Seq Scan on tasks" / "Seq Scan on tasks tasks_1"
+_POSTGRES_SCAN = re.compile(r"Seq Scan on (" + "|".join(WATCHED_TABLES) + r")\b")
+
+
+class QueryBudgetExceeded(RuntimeError):
+    """Запрос превысил бюджет обращений к БД или повторяет одну форму запроса"""
+
+
+def statement_shape(statement: str) -> str:
+    """Форма запроса без значений: IN (?, ?, ?) и VALUES из многих строк сворачиваются"""
+    shape = re.sub(r"\$\d+", "?", statement)  # плейсхолдеры asyncpg
+    shape = re.sub(r"\s+", " ", shape).strip()
+    shape = re.sub(r"\(\s*\?(?:\s*,\s*\?)*\s*\)", "(?)", shape)
+    return re.sub(r"\(\?\)(?:\s*,\s*\(\?\))+", "(?)", shape)
+
+
+class QueryReport:
+    """Запросы к БД за один HTTP-запрос (или блок track())"""
+
+    def __init__(self, mode: str = QUERY_GUARD, budget: int = QUERY_BUDGET,
+                 repeat_limit: int = QUERY_REPEAT_LIMIT, label: str = ""):
+        self.mode = mode
+        self.budget = budget
+        self.repeat_limit = repeat_limit
+        self.label = label
+        self.queries = 0
+        self.shapes: Counter = Counter()
+        # форма запроса -> план с полным просмотром tasks/users
+        self.scans: Dict[str, str] = {}
+        self.violations: List[str] = []
+
+    def _violate(self, message: str) -> None:
+        self.violations.append(message)
+        if self.mode == "raise":
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
+
+    def record(self, shape: str) -> None:
+        self.queries += 1
+        self.shapes[shape] += 1
+        # Каждое нарушение сообщается один раз — на запросе, который его вызвал
+        if self.queries == self.budget + 1:
+            self._violate(f"{self.label}: больше {self.budget} запросов к БД, последний: {shape[:200]}")
+        if self.shapes[shape] == self.repeat_limit + 1:
+            self._violate(f"{self.label}: запрос повторён больше {self.repeat_limit} раз (N+1?): {shape[:200]}")
+
+
+_current: ContextVar[Optional[QueryReport]] = ContextVar("query_report", default=None)
+
+
+@contextmanager
+def track(**kwargs) -> Iterator[QueryReport]:
+    """Считать запросы к БД внутри блока; параметры — как у QueryReport"""
+    report = QueryReport(**kwargs)
+    token = _current.set(report)
+    try:
+        yield report
+    finally:
+        _current.reset(token)
+
+
+# Форма запроса -> план с полным просмотром или None. План строится один раз
+# на форму: EXPLAIN на каждый запрос удвоил бы число обращений к БД
+_plans: Dict[str, Optional[str]] = {}
+
+
+def _explain(conn, statement: str, parameters) -> Optional[str]:
+    backend = conn.dialect.name
+    if backend == "sqlite":
+        sql, is_scan = "EXPLAIN QUERY PLAN " + statement, lambda row: _SQLITE_SCAN.match(row[-1])
+    elif backend == "postgresql":
+        sql, is_scan = "EXPLAIN " + statement, lambda row: _POSTGRES_SCAN.search(row[0])
+    else:
+        return None
+
+    # Отдельный курсор DBAPI мимо событий движка, иначе EXPLAIN попал бы в счётчики
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        cursor.execute(sql, parameters)
+        rows = cursor.fetchall()
+    finally:
+        cursor.close()
+    if not any(is_scan(row) for row in rows):
+        return None
+    return "\n".join(str(row[-1] if backend == "sqlite" else row[0]) for row in rows)
+
+
+def _scan_plan(conn, statement: str, shape: str, parameters) -> Optional[str]:
+    if shape in _plans:
+        return _plans[shape]
+    plan = None
+    try:
+        plan = _explain(conn, statement, parameters)
+    except Exception:
+        logger.debug("EXPLAIN не выполнен: %s", shape[:200], exc_info=True)
+    _plans[shape] = plan
+    if plan is not None:
+        logger.warning("Полный просмотр таблицы: %s\n%s", shape[:500], plan)
+    return plan
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    report = _current.get()
+    if report is None or not _COUNTED.match(statement):
+        return
+    shape = statement_shape(statement)
+    if not executemany and _EXPLAINED.match(statement) and _WATCHED.search(statement):
+        plan = _scan_plan(conn, statement, shape, parameters)
+        if plan is not None:
+            report.scans[shape] = plan
+    report.record(shape)
+
+
+def guard_engine(engine) -> None:
+    """Считать запросы к БД в QueryReport текущего запроса и искать полные просмотры"""
+    event.listen(engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class QueryGuardMiddleware:
+    """Заводит QueryReport на каждый HTTP-запрос; нарушения пишутся в лог
+    или роняют запрос по режиму QUERY_GUARD"""
+
+    def __init__(self, app: ASGIApp, mode: str = QUERY_GUARD, exempt=QUERY_GUARD_EXEMPT):
+        self.app = app
+        self.mode = mode
+        self.exempt = set(exempt)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] in self.exempt:
+            await self.app(scope, receive, send)
+            return
+
+        with track(mode=self.mode, label=f"{scope['method']} {scope['path']}"):
+            await self.app(scope, receive, send)
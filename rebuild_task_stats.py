@@ -0,0 +1,28 @@
+# rebuild_task_stats.py
+import argparse
+import asyncio
+from database import AsyncSessionLocal
+from task_stats import find_drift, rebuild
+
+async def main(verify_only: bool):
+    async with AsyncSessionLocal() as db:
+        drift = await find_drift(db)
+
+        for user_id, (stored, expected) in sorted(drift.items()):
+            print(f"user_id={user_id}: сохранено {stored}, должно быть {expected}")
+
+        if verify_only:
+            print("✅ Счётчики совпадают с задачами" if not drift
+                  else f"❌ Расхождения у {len(drift)} пользователей")
+            return 1 if drift else 0
+
+        users = await rebuild(db)
+        print(f"✅ Счётчики пересобраны для {users} пользователей")
+        return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Пересчёт таблицы user_task_stats")
+    parser.add_argument("--verify", action="store_true",
+                        help="только проверить расхождения, ничего не меняя")
+    args = parser.parse_args()
+    raise SystemExit(asyncio.run(main(args.verify)))
@@ -0,0 +1,53 @@
+import os
+import time
+from typing import Any, Dict, Optional
+
+from fastapi.responses import JSONResponse
+from pydantic_core import to_json
+
+from profiling import record_serialize
+
+try:
+    import orjson
+except ImportError:  # orjson — необязательная зависимость
+    orjson = None
+
+# Эндпоинты задач отдают уже готовые словари (serializers.py); повторная
+# валидация через response_model для них лишняя. FAST_JSON_RESPONSES=0 возвращает её.
+FAST_JSON_RESPONSES = os.getenv("FAST_JSON_RESPONSES", "1") == "1"
+
+
+def dumps(content: Any) -> bytes:
+    """Сериализовать в JSON-байты через orjson или pydantic_core"""
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS)
+    return to_json(content)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON-ответ, сериализуемый сразу в байты через orjson или pydantic_core"""
+
+    def render(self, content: Any) -> bytes:
+        started = time.perf_counter()
+        body = dumps(content)
+        record_serialize(0, time.perf_counter() - started)
+        return body
+
+
+def fast_json(content: Any, status_code: int = 200, headers: Optional[Dict[str, str]] = None) -> Any:
+    """Вернуть готовый ответ в обход response_model (если быстрый путь включён)"""
+    if not FAST_JSON_RESPONSES:
+        return content
+    return FastJSONResponse(content, status_code=status_code, headers=headers)
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Слабое сравнение ETag с заголовком If-None-Match (список через запятую или *)"""
+    if not if_none_match:
+        return False
+    opaque = etag.removeprefix("W/")
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == opaque:
+            return True
+    return False
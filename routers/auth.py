@@ -5,8 +5,8 @@ from sqlalchemy import select
 from database import get_async_session
 from models import User, UserRole
 from schemas_auth import UserCreate, UserResponse, Token, PasswordChange
-from auth_utils import verify_password, get_password_hash, create_access_token
-from dependencies import get_current_user
+from auth_utils import verify_password_async, get_password_hash_async, create_access_token
+from dependencies import get_current_user, get_current_user_for_update
 
 
 router = APIRouter(
@@ -46,7 +46,7 @@ async def register(
     new_user = User(
         nickname=user_data.nickname,
         email=user_data.email,
-        hashed_password=get_password_hash(user_data.password),
+        hashed_password=await get_password_hash_async(user_data.password),
         role=UserRole.USER # По умолчанию обычный пользователь
     )
 
@@ -69,7 +69,7 @@ async def login(
     user = result.scalar_one_or_none()
 
  # Проверяем пользователя и пароль
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    if not user or not await verify_password_async(form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Неверный email или пароль",
@@ -97,7 +97,7 @@ async def get_me(
 async def change_password(
     password_data: PasswordChange,
     db: AsyncSession = Depends(get_async_session),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user_for_update)
 ):
     """
     Смена пароля пользователя
@@ -109,7 +109,7 @@ async def change_password(
     Доступно только аутентифицированным пользователям
     """
     # Проверяем старый пароль
-    if not verify_password(password_data.old_password, current_user.hashed_password):
+    if not await verify_password_async(password_data.old_password, current_user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Неверный старый пароль"
@@ -123,7 +123,7 @@ async def change_password(
         )
     
     # Хешируем новый пароль
-    new_hashed_password = get_password_hash(password_data.new_password)
+    new_hashed_password = await get_password_hash_async(password_data.new_password)
     
     # Обновляем пароль в базе данных
     current_user.hashed_password = new_hashed_password
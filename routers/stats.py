@@ -1,5 +1,6 @@
 
 from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
 
 from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, status
@@ -7,11 +8,17 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
 from sqlalchemy.orm import selectinload
 
-from database import get_async_session
-from models import User, Task
+from models import User, Task, UserTaskStats
 from schemas_auth import UserResponse
-from dependencies import get_current_user, get_current_admin
+from dependencies import get_current_user, get_current_admin, get_read_session, get_timezone, get_etag_headers
 from pydantic import BaseModel
+from task_stats import read_counters, stats_response
+from quadrants import count_became_urgent, shift_quadrant_counters
+from scheduler import urgency_scheduler
+from user_cache import user_cache
+from events import task_events
+from auth_utils import password_hash_pool
+from responses import fast_json
 
 router = APIRouter(
     prefix="/stats",
@@ -19,83 +26,58 @@ router = APIRouter(
 )
 
 @router.get("/", response_model=dict)
-async def get_tasks_stats(db: AsyncSession = Depends(get_async_session),
-                          current_user: User = Depends(get_current_user)
+async def get_tasks_stats(db: AsyncSession = Depends(get_read_session),
+                          current_user: User = Depends(get_current_user),
+                          etag_headers: dict = Depends(get_etag_headers)
                           ) -> dict:
-    if current_user.role.value == 'admin':
-        result = await db.execute(select(Task))
-    else:
-        result = await db.execute(select(Task).where(Task.user_id == current_user.id))
-    tasks = result.scalars().all()
-    total_tasks = len(tasks)
-    by_quadrant = {"Q1": 0, "Q2": 0, "Q3": 0, "Q4": 0}
-    by_status = {"completed": 0, "pending": 0}
-
-    for task in tasks:
-        if task.quadrant in by_quadrant:
-            by_quadrant[task.quadrant] += 1
-        if task.completed:
-            by_status["completed"] += 1
-        else:
-            by_status["pending"] += 1
-    return {
-        "total_tasks": total_tasks,
-        "by_quadrant": by_quadrant,
-        "by_status": by_status
-    }
+    # Читаем материализованные счётчики вместо пересчёта по таблице задач
+    user_id = None if current_user.role.value == 'admin' else current_user.id
+    counters = await read_counters(db, user_id)
+
+    # Счётчики ведутся по сохранённому квадранту; задачи, ставшие срочными
+    # после последней записи, находим диапазонным запросом по urgent_from
+    became_urgent = await count_became_urgent(db, user_id, datetime.now(timezone.utc))
+    return fast_json(stats_response(shift_quadrant_counters(counters, became_urgent)),
+                     headers=etag_headers)
 
 #  Статистика по дедлайнам
 @router.get("/deadlines")
-async def get_deadline_stats(db: AsyncSession = Depends(get_async_session),
+async def get_deadline_stats(tz: ZoneInfo = Depends(get_timezone),
+                             db: AsyncSession = Depends(get_read_session),
                              current_user: User = Depends(get_current_user)):
     """Статистика по срокам выполнения задач со статусом 'pending'"""
-    today = datetime.now(timezone.utc).date()
-    
-    if current_user.role.value == 'admin':
-        result = await db.execute(
-            select(Task).where(
-                and_(
-                    Task.completed == False,
-                    Task.deadline_at.isnot(None)
-                )
-            )
-        )
-    else:
-        result = await db.execute(
-            select(Task).where(
-                and_(
-                    Task.user_id == current_user.id,
-                    Task.completed == False,
-                    Task.deadline_at.isnot(None)
-                )
-            )
-        )
-
-    pending_tasks = result.scalars().all()
-    
+    today = datetime.now(timezone.utc).astimezone(tz).date()
+
+    # Фильтр и сортировка в SQL по частичному индексу ix_tasks_user_pending_deadline:
+    # порядок по дедлайну совпадает с порядком по days_remaining
+    stmt = select(
+        Task.id, Task.title, Task.description, Task.created_at, Task.deadline_at
+    ).where(
+        Task.completed == False,
+        Task.deadline_at.isnot(None)
+    ).order_by(Task.deadline_at, Task.id)
+    if current_user.role.value != 'admin':
+        stmt = stmt.where(Task.user_id == current_user.id)
+
+    result = await db.execute(stmt)
+
     stats = []
-    for task in pending_tasks:
-        if task.deadline_at:
-            if task.deadline_at.tzinfo:
-                deadline_date = task.deadline_at.astimezone(timezone.utc).date()
-            else:
-                deadline_date = task.deadline_at.date()
-            
-            days_remaining = (deadline_date - today).days
-            
-            stats.append({
-                "id": task.id,
-                "title": task.title,
-                "description": task.description,
-                "created_at": task.created_at,
-                "deadline_at": task.deadline_at,
-                "days_remaining": days_remaining
-            })
-    
+    for task in result.all():
+        # Без tzinfo (SQLite) дедлайн хранится в UTC
+        deadline = task.deadline_at if task.deadline_at.tzinfo else task.deadline_at.replace(tzinfo=timezone.utc)
+        stats.append({
+            "id": task.id,
+            "title": task.title,
+            "description": task.description,
+            "created_at": task.created_at,
+            "deadline_at": task.deadline_at,
+            "days_remaining": (deadline.astimezone(tz).date() - today).days
+        })
+
     return {
         "today": today.isoformat(),
         "total_pending_tasks_with_deadlines": len(stats),
-        "tasks": sorted(stats, key=lambda x: x["days_remaining"])
+        "tasks": stats
     }
 
 
@@ -112,7 +94,7 @@ class UserWithTasksCount(BaseModel):
 
 @router.get("/users", response_model=List[UserWithTasksCount])
 async def get_all_users(
-    db: AsyncSession = Depends(get_async_session),
+    db: AsyncSession = Depends(get_read_session),
     admin: User = Depends(get_current_admin)
 ) -> List[UserWithTasksCount]:
     """
@@ -125,10 +107,10 @@ async def get_all_users(
         User.nickname,
         User.email,
         User.role,
-        func.count(Task.id).label('tasks_count')
+        func.coalesce(UserTaskStats.total, 0).label('tasks_count')
     ).join(
-        Task, User.id == Task.user_id, isouter=True
-    ).group_by(User.id)
+        UserTaskStats, User.id == UserTaskStats.user_id, isouter=True
+    )
     
     result = await db.execute(stmt)
     users_with_counts = result.all()
@@ -143,4 +125,44 @@ async def get_all_users(
             tasks_count=user.tasks_count
         ))
     
-    return users_list
\ No newline at end of file
+    return users_list
+
+
+@router.get("/scheduler")
+async def get_scheduler_stats(admin: User = Depends(get_current_admin)) -> dict:
+    """
+    Метрики фонового переноса задач в срочные квадранты
+
+    Доступно только администраторам
+    """
+    return urgency_scheduler.metrics()
+
+
+@router.get("/user-cache")
+async def get_user_cache_stats(admin: User = Depends(get_current_admin)) -> dict:
+    """
+    Попадания и промахи кэша пользователей в get_current_user
+
+    Доступно только администраторам
+    """
+    return user_cache.stats()
+
+
+@router.get("/password-hashing")
+async def get_password_hashing_stats(admin: User = Depends(get_current_admin)) -> dict:
+    """
+    Загрузка и очередь пула bcrypt
+
+    Доступно только администраторам
+    """
+    return password_hash_pool.stats()
+
+
+@router.get("/events")
+async def get_event_bus_stats(admin: User = Depends(get_current_admin)) -> dict:
+    """
+    Подписчики /tasks/stream и доставка событий
+
+    Доступно только администраторам
+    """
+    return task_events.metrics()
@@ -1,13 +1,27 @@
-from fastapi import APIRouter, HTTPException, Query, status, Depends
+from fastapi import APIRouter, Body, HTTPException, Query, Request, status, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from typing import List, Optional
-from datetime import datetime, timezone, timedelta
-from utils import calculate_urgency, calculate_days_until_deadline, calculate_quadrant
-from database import get_async_session
-from models import Task, User
-from schemas import TaskCreate, TaskResponse, TaskUpdate
-from dependencies import get_current_user
+from sqlalchemy import case, delete, insert, select, update
+from typing import Any, List, NoReturn, Optional
+from datetime import date, datetime, timezone
+from zoneinfo import ZoneInfo
+from utils import calculate_quadrant, calculate_urgent_from, day_range
+from database import get_async_session, read_sessionmaker
+from models import Task, TaskTombstone, User, UserRole
+from schemas import (TaskCreate, TaskResponse, TaskUpdate, TaskPage,
+                     TaskBatchIds, TaskBatchComplete, TaskBatchResult, TaskImportResult, TaskChanges)
+from serializers import TASK_COLUMNS, serialize_tasks, task_page
+from fastapi.responses import StreamingResponse
+from responses import fast_json
+from dependencies import get_current_user, get_read_session, get_stream_user, get_timezone, get_etag_headers
+from pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, paginate, split_page, encode_cursor
+from task_stats import apply_task_change, next_version, read_version
+from search import search_tasks_page
+from quadrants import quadrant_condition
+from scheduler import urgency_scheduler
+from events import sse_stream, task_event, task_events
+import task_batch
+import task_export
+import task_import
 
 router = APIRouter(
     prefix="/tasks",
@@ -17,149 +31,98 @@ router = APIRouter(
 
 
 # GET ALL TASKS - Получить все задачи
-@router.get("", response_model=List[TaskResponse])
+@router.get("", response_model=TaskPage)
 async def get_all_tasks(
-    db: AsyncSession = Depends(get_async_session),
-    current_user: User = Depends(get_current_user)
-) -> List[TaskResponse]:
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="Курсор из next_cursor предыдущей страницы"),
+    db: AsyncSession = Depends(get_read_session),
+    current_user: User = Depends(get_current_user),
+    etag_headers: dict = Depends(get_etag_headers)
+) -> dict:
+    now = datetime.now(timezone.utc)
+
     if current_user.role.value == "admin":
-        result = await db.execute(select(Task))
+        stmt = select(*TASK_COLUMNS)
     else:
-        result = await db.execute(select(Task).where(Task.user_id == current_user.id))
-    
-    tasks = result.scalars().all()
-    
-    # Преобразуем задачи с расчетными полями
-    response_tasks = []
-    for task in tasks:
-        is_urgent = calculate_urgency(task.deadline_at)
-        days_until_deadline = calculate_days_until_deadline(task.deadline_at)
-        
-        response_tasks.append(TaskResponse(
-            id=task.id,
-            title=task.title,
-            description=task.description,
-            is_important=task.is_important,
-            deadline_at=task.deadline_at,
-            quadrant=task.quadrant,
-            is_urgent=is_urgent,
-            days_until_deadline=days_until_deadline,
-            completed=task.completed,
-            created_at=task.created_at,
-            completed_at=task.completed_at,
-            user_id = task.user_id
-        ))
+        stmt = select(*TASK_COLUMNS).where(Task.user_id == current_user.id)
+
+    # Ключ страницы — id, то есть порядок создания: id только растут (AUTOINCREMENT),
+    # поэтому отдельный ключ (created_at, id) не нужен
+    result = await db.execute(paginate(stmt, [Task.id], limit, cursor))
+    rows, next_cursor = split_page(result.all(), limit, lambda row: (row.id,))
     
-    return response_tasks
+    return fast_json(task_page(rows, next_cursor, now), headers=etag_headers)
 
 # SEARCH TASKS - Поиск задач 
-@router.get("/search", response_model=List[TaskResponse])
+@router.get("/search", response_model=TaskPage)
 async def search_tasks(
     q: str = Query(..., min_length=2),
-    db: AsyncSession = Depends(get_async_session),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="Курсор из next_cursor предыдущей страницы"),
+    db: AsyncSession = Depends(get_read_session),
     current_user: User = Depends(get_current_user)
-) -> List[TaskResponse]:
-    keyword = f"%{q.lower()}%"
-    
-    if current_user.role.value == "admin":
-        result = await db.execute(
-            select(Task).where(
-                (Task.title.ilike(keyword)) |
-                (Task.description.ilike(keyword))
-            )
-    )
-    else:
-        result = await db.execute(
-            select(Task).where(
-                Task.user_id == current_user.id,
-                (Task.title.ilike(keyword)) |
-                (Task.description.ilike(keyword))
-            )
-    )
-        
-    tasks = result.scalars().all()
+) -> dict:
+    # Полнотекстовый индекс вместо ILIKE '%q%', который не может использовать индексы
+    now = datetime.now(timezone.utc)
+    user_id = None if current_user.role.value == "admin" else current_user.id
+    rows, next_cursor = await search_tasks_page(db, q, user_id, limit, cursor)
 
-    if not tasks:
+    if not rows and cursor is None:
         raise HTTPException(status_code=404, detail="По данному запросу ничего не найдено")
     
-    # Добавляем расчетные поля
-    response_tasks = []
-    for task in tasks:
-        is_urgent = calculate_urgency(task.deadline_at)
-        days_until_deadline = calculate_days_until_deadline(task.deadline_at)
-        
-        response_tasks.append(TaskResponse(
-            id=task.id,
-            title=task.title,
-            description=task.description,
-            is_important=task.is_important,
-            deadline_at=task.deadline_at,
-            quadrant=task.quadrant,
-            is_urgent=is_urgent,
-            days_until_deadline=days_until_deadline,
-            completed=task.completed,
-            created_at=task.created_at,
-            completed_at=task.completed_at,
-            user_id = task.user_id
-        ))
-    
-    return response_tasks
+    return fast_json(task_page(rows, next_cursor, now))
+
+# EXPORT TASKS - Выгрузка всех задач потоком (NDJSON или CSV)
+@router.get("/export")
+async def export_tasks(
+    export_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    current_user: User = Depends(get_current_user)
+) -> StreamingResponse:
+    # Сессия открывается внутри генератора и живёт, пока отдаётся тело ответа
+    user_id = None if current_user.role.value == "admin" else current_user.id
+    return task_export.export_response(export_format, read_sessionmaker(current_user.id), user_id)
 
 # GET TASKS BY QUADRANT - Получить задачи по квадранту
-@router.get("/quadrant/{quadrant}", response_model=List[TaskResponse])
+@router.get("/quadrant/{quadrant}", response_model=TaskPage)
 async def get_tasks_by_quadrant(
     quadrant: str,
-    db: AsyncSession = Depends(get_async_session),
-    current_user: User = Depends(get_current_user)
-) -> List[TaskResponse]:
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="Курсор из next_cursor предыдущей страницы"),
+    db: AsyncSession = Depends(get_read_session),
+    current_user: User = Depends(get_current_user),
+    etag_headers: dict = Depends(get_etag_headers)
+) -> dict:
     if quadrant not in ["Q1", "Q2", "Q3", "Q4"]:
         raise HTTPException(
             status_code=400,
             detail="Неверный квадрант. Используйте: Q1, Q2, Q3, Q4"
         )
     
+    # Квадрант на момент запроса, а не сохранённый при последней записи
+    now = datetime.now(timezone.utc)
+    condition = quadrant_condition(quadrant, now)
+
     if current_user.role.value == 'admin':
-        result = await db.execute(
-            select(Task).where(Task.quadrant == quadrant)
-        )
+        stmt = select(*TASK_COLUMNS).where(condition)
     else:
-        result = await db.execute(
-            select(Task).where(Task.quadrant == quadrant,
-                               Task.user_id == current_user.id)
-        )
+        stmt = select(*TASK_COLUMNS).where(condition,
+                                           Task.user_id == current_user.id)
 
-    tasks = result.scalars().all()
+    result = await db.execute(paginate(stmt, [Task.id], limit, cursor))
+    rows, next_cursor = split_page(result.all(), limit, lambda row: (row.id,))
     
-    # Добавляем расчетные поля
-    response_tasks = []
-    for task in tasks:
-        is_urgent = calculate_urgency(task.deadline_at)
-        days_until_deadline = calculate_days_until_deadline(task.deadline_at)
-        
-        response_tasks.append(TaskResponse(
-            id=task.id,
-            title=task.title,
-            description=task.description,
-            is_important=task.is_important,
-            deadline_at=task.deadline_at,
-            quadrant=task.quadrant,
-            is_urgent=is_urgent,
-            days_until_deadline=days_until_deadline,
-            completed=task.completed,
-            created_at=task.created_at,
-            completed_at=task.completed_at,
-            user_id = task.user_id
-        ))
-    
-    return response_tasks
+    return fast_json(task_page(rows, next_cursor, now), headers=etag_headers)
 
 # GET TASKS BY STATUS - Получить задачи по статусу
-@router.get("/status/{status}", response_model=List[TaskResponse])
+@router.get("/status/{status}", response_model=TaskPage)
 async def get_tasks_by_status(
     status: str,
-    db: AsyncSession = Depends(get_async_session),
-    current_user: User = Depends(get_current_user)
-) -> List[TaskResponse]:
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="Курсор из next_cursor предыдущей страницы"),
+    db: AsyncSession = Depends(get_read_session),
+    current_user: User = Depends(get_current_user),
+    etag_headers: dict = Depends(get_etag_headers)
+) -> dict:
     if status not in ["completed", "pending"]:
         raise HTTPException(
             status_code=400,
@@ -167,81 +130,167 @@ async def get_tasks_by_status(
         )
 
     is_completed = (status == "completed")
+    now = datetime.now(timezone.utc)
 
     if current_user.role.value == 'admin':
-        result = await db.execute(
-            select(Task).where(Task.completed == is_completed)
-        )
+        stmt = select(*TASK_COLUMNS).where(Task.completed == is_completed)
     else:
-        result = await db.execute(
-        select(Task).where(Task.completed == is_completed,
-                           Task.user_id == current_user.id)
-    )
+        stmt = select(*TASK_COLUMNS).where(Task.completed == is_completed,
+                                           Task.user_id == current_user.id)
 
-    tasks = result.scalars().all()
+    result = await db.execute(paginate(stmt, [Task.id], limit, cursor))
+    rows, next_cursor = split_page(result.all(), limit, lambda row: (row.id,))
     
-    # Добавляем расчетные поля
-    response_tasks = []
-    for task in tasks:
-        is_urgent = calculate_urgency(task.deadline_at)
-        days_until_deadline = calculate_days_until_deadline(task.deadline_at)
-        
-        response_tasks.append(TaskResponse(
-            id=task.id,
-            title=task.title,
-            description=task.description,
-            is_important=task.is_important,
-            deadline_at=task.deadline_at,
-            quadrant=task.quadrant,
-            is_urgent=is_urgent,
-            days_until_deadline=days_until_deadline,
-            completed=task.completed,
-            created_at=task.created_at,
-            completed_at=task.completed_at,
-            user_id = task.user_id
-        ))
-    
-    return response_tasks
+    return fast_json(task_page(rows, next_cursor, now), headers=etag_headers)
+
+# Невыполненные задачи с дедлайном в полуинтервале [start, end), по возрастанию
+# дедлайна; диапазон по частичному индексу ix_tasks_user_pending_deadline
+async def _due_page(db: AsyncSession, current_user: User, start: datetime, end: datetime,
+                    limit: int, cursor: Optional[str], now: datetime) -> dict:
+    stmt = select(*TASK_COLUMNS).where(
+        Task.completed == False,
+        Task.deadline_at >= start,
+        Task.deadline_at < end
+    )
+    if current_user.role.value != 'admin':
+        stmt = stmt.where(Task.user_id == current_user.id)
+
+    columns = [Task.deadline_at, Task.id]
+    result = await db.execute(paginate(stmt, columns, limit, cursor))
+    rows, next_cursor = split_page(
+        result.all(), limit, lambda row: (row.deadline_at, row.id)
+    )
+    return task_page(rows, next_cursor, now)
+
+# GET TASKS (TODAY) - Получить задачи, срок которых истекает сегодня
+@router.get("/today", response_model=TaskPage)
+async def get_tasks_due_today(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="Курсор из next_cursor предыдущей страницы"),
+    tz: ZoneInfo = Depends(get_timezone),
+    db: AsyncSession = Depends(get_read_session),
+    current_user: User = Depends(get_current_user)
+) -> dict:
+    """Получить задачи, срок выполнения которых истекает сегодня (в часовом поясе tz)"""
+    now = datetime.now(timezone.utc)
+    today = now.astimezone(tz).date()
+    start, end = day_range(today, today, tz)
+
+    return fast_json(await _due_page(db, current_user, start, end, limit, cursor, now))
+
+# GET TASKS (DUE) - Получить задачи с дедлайном в заданном окне дней
+@router.get("/due", response_model=TaskPage)
+async def get_tasks_due(
+    from_day: Optional[date] = Query(None, alias="from", description="Первый день окна (по умолчанию сегодня)"),
+    to_day: Optional[date] = Query(None, alias="to", description="Последний день окна включительно (по умолчанию from)"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="Курсор из next_cursor предыдущей страницы"),
+    tz: ZoneInfo = Depends(get_timezone),
+    db: AsyncSession = Depends(get_read_session),
+    current_user: User = Depends(get_current_user)
+) -> dict:
+    now = datetime.now(timezone.utc)
+    if from_day is None:
+        from_day = now.astimezone(tz).date()
+    if to_day is None:
+        to_day = from_day
+    if to_day < from_day:
+        raise HTTPException(status_code=400, detail="Параметр to не может быть раньше from")
+
+    start, end = day_range(from_day, to_day, tz)
+    return fast_json(await _due_page(db, current_user, start, end, limit, cursor, now))
+
+# GET TASK CHANGES - Изменения задач после токена синхронизации
+@router.get("/changes", response_model=TaskChanges)
+async def get_task_changes(
+    since: Optional[str] = Query(None, description="next_token предыдущего ответа; без него — полная выгрузка"),
+    limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_read_session),
+    current_user: User = Depends(get_current_user)
+) -> dict:
+    # Токен — позиция (change_seq, id) последнего отданного изменения. Задачи и отметки
+    # об удалении идут одной лентой по (change_seq, id), страница — первые limit из обеих.
+    # Читается только до версии, прочитанной в начале: записи с меньшей версией уже
+    # закоммичены (см. task_stats.next_versions), и запись между двумя SELECT не будет пропущена
+    now = datetime.now(timezone.utc)
+    horizon = await read_version(db, current_user.id)
+
+    stmt = (select(*TASK_COLUMNS, Task.change_seq)
+            .where(Task.user_id == current_user.id, Task.change_seq <= horizon))
+    result = await db.execute(paginate(stmt, [Task.change_seq, Task.id], limit, since))
+    changes = [(row.change_seq, row.id, row) for row in result.all()]
+
+    # Полная выгрузка (без since) отдаёт только живые задачи
+    if since is not None:
+        stmt = (select(TaskTombstone.change_seq, TaskTombstone.task_id)
+                .where(TaskTombstone.user_id == current_user.id, TaskTombstone.change_seq <= horizon))
+        result = await db.execute(paginate(stmt, [TaskTombstone.change_seq, TaskTombstone.task_id], limit, since))
+        changes.extend((row.change_seq, row.task_id, None) for row in result.all())
+
+    changes.sort(key=lambda change: change[:2])
+    changes, next_cursor = split_page(changes, limit, lambda change: change[:2])
+    has_more = next_cursor is not None
+    if not has_more:
+        next_cursor = encode_cursor(changes[-1][:2]) if changes else since or encode_cursor([0, 0])
+
+    return fast_json({
+        "items": serialize_tasks([row[:-1] for _, _, row in changes if row is not None], now),
+        "deleted": [{"id": task_id, "change_seq": change_seq} for change_seq, task_id, row in changes if row is None],
+        "next_token": next_cursor,
+        "has_more": has_more,
+    })
+
+# STREAM - События изменений задач (Server-Sent Events) вместо опроса /tasks
+@router.get("/stream", response_class=StreamingResponse)
+async def stream_task_events(
+    current_user: User = Depends(get_stream_user)
+) -> StreamingResponse:
+    # События: created, updated, deleted (задача) и bulk, resync (перечитать через /tasks/changes).
+    # Администратор получает события по задачам всех пользователей
+    subscription = task_events.subscribe(current_user.id, current_user.role == UserRole.ADMIN)
+    return StreamingResponse(
+        sse_stream(task_events, subscription),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 # GET TASK BY ID - Получить задачу по ID
 @router.get("/{task_id}", response_model=TaskResponse)
 async def get_task_by_id(
     task_id: int,
-    db: AsyncSession = Depends(get_async_session),
+    db: AsyncSession = Depends(get_read_session),
     current_user: User = Depends(get_current_user)
-) -> TaskResponse:
-    if current_user.role.value == 'admin':
-        result = await db.execute(
-            select(Task).where(Task.id == task_id)
-        )
-    else:
-        result = await db.execute(
-        select(Task).where(Task.id == task_id,
-                           Task.user_id == current_user.id)
-    )
-    task = result.scalar_one_or_none()
+) -> dict:
+    stmt = select(*TASK_COLUMNS).where(Task.id == task_id)
+    if current_user.role.value != 'admin':
+        stmt = stmt.where(Task.user_id == current_user.id)
+
+    row = (await db.execute(stmt)).one_or_none()
 
-    if not task:
+    if not row:
         raise HTTPException(status_code=404, detail="Задача не найдена")
-    
-    # Добавляем расчетные поля
-    is_urgent = calculate_urgency(task.deadline_at)
-    days_until_deadline = calculate_days_until_deadline(task.deadline_at)
-    
-    return TaskResponse(
-        id=task.id,
-        title=task.title,
-        description=task.description,
-        is_important=task.is_important,
-        deadline_at=task.deadline_at,
-        quadrant=task.quadrant,
-        is_urgent=is_urgent,
-        days_until_deadline=days_until_deadline,
-        completed=task.completed,
-        created_at=task.created_at,
-        completed_at=task.completed_at,
-        user_id = task.user_id
-    )
+
+    return fast_json(serialize_tasks([row])[0])
+
+# Запись задачи — одна инструкция INSERT/UPDATE/DELETE ... RETURNING без
+# предварительного SELECT и refresh: права проверяются условием на владельца в WHERE
+
+# Владелец, под чьей версией (next_version) пишется изменение. Для пользователя это он сам;
+# администратору, который может менять чужие задачи, владельца нужно узнать
+async def _write_owner(db: AsyncSession, current_user: User, task_id: int) -> int:
+    if current_user.role.value != 'admin':
+        return current_user.id
+
+    owner_id = await db.scalar(select(Task.user_id).where(Task.id == task_id))
+    if owner_id is None:
+        raise HTTPException(status_code=404, detail="Задача не найдена")
+    return owner_id
+
+# Запись не затронула ни одной строки: различаем 404 и 403 только на этом, редком, пути
+async def _raise_not_written(db: AsyncSession, task_id: int) -> NoReturn:
+    if await db.scalar(select(Task.id).where(Task.id == task_id)) is None:
+        raise HTTPException(status_code=404, detail="Задача не найдена")
+    raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Нет доступа к этой задаче")
 
 # POST - СОЗДАНИЕ НОВОЙ ЗАДАЧИ
 @router.post("/", response_model=TaskResponse, status_code=status.HTTP_201_CREATED)
@@ -249,42 +298,108 @@ async def create_task(
     task: TaskCreate,
     db: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user)
-) -> TaskResponse:
+) -> dict:
     # Рассчитываем квадрант на основе важности и дедлайна
-    quadrant = calculate_quadrant(task.is_important, task.deadline_at)
-
-    new_task = Task(
-        title=task.title,
-        description=task.description,
-        is_important=task.is_important,
-        deadline_at=task.deadline_at,
-        quadrant=quadrant,
-        completed=False,
-        user_id = current_user.id
+    now = datetime.now(timezone.utc)
+    quadrant = calculate_quadrant(task.is_important, task.deadline_at, now)
+    urgent_from = calculate_urgent_from(task.deadline_at)
+    change_seq = await next_version(db, current_user.id)
+
+    # id и created_at (server_default) возвращает сам INSERT
+    result = await db.execute(
+        insert(Task).values(
+            title=task.title,
+            description=task.description,
+            is_important=task.is_important,
+            deadline_at=task.deadline_at,
+            urgent_from=urgent_from,
+            quadrant=quadrant,
+            completed=False,
+            user_id=current_user.id,
+            change_seq=change_seq
+        ).returning(*TASK_COLUMNS)
     )
+    row = result.one()
 
-    db.add(new_task)
+    await apply_task_change(db, current_user.id, after=(quadrant, False))
     await db.commit()
-    await db.refresh(new_task)
-    
-    # Добавляем расчетные поля для ответа
-    is_urgent = calculate_urgency(new_task.deadline_at)
-    days_until_deadline = calculate_days_until_deadline(new_task.deadline_at)
-    
-    return TaskResponse(
-        id=new_task.id,
-        title=new_task.title,
-        description=new_task.description,
-        is_important=new_task.is_important,
-        deadline_at=new_task.deadline_at,
-        quadrant=new_task.quadrant,
-        is_urgent=is_urgent,  # Расчетное поле для ответа
-        days_until_deadline=days_until_deadline,
-        completed=new_task.completed,
-        created_at=new_task.created_at,
-        completed_at=new_task.completed_at,
-        user_id = new_task.user_id
-    )
+    urgency_scheduler.schedule(quadrant, urgent_from)
+
+    response = serialize_tasks([row], now)[0]
+    await task_events.publish(task_event("created", current_user.id, row.id, response, change_seq=change_seq))
+    return fast_json(response, status_code=status.HTTP_201_CREATED)
+
+# ПАКЕТНЫЕ ОПЕРАЦИИ - одна транзакция на пакет, статус по каждому элементу
+@router.post("/batch", response_model=TaskBatchResult)
+async def create_tasks_batch(
+    items: List[Any] = Body(..., min_length=1, description="Список задач в формате TaskCreate"),
+    db: AsyncSession = Depends(get_async_session),
+    current_user: User = Depends(get_current_user)
+) -> dict:
+    results, scheduled, events = await task_batch.create_tasks(db, current_user, items)
+    await db.commit()
+    for quadrant, urgent_from in scheduled:
+        urgency_scheduler.schedule(quadrant, urgent_from)
+    await task_events.publish_many(events)
+
+    return fast_json(task_batch.batch_response(results))
+
+
+@router.patch("/batch", response_model=TaskBatchResult)
+async def update_tasks_batch(
+    items: List[Any] = Body(..., min_length=1, description="Список изменений в формате TaskUpdate с полем id"),
+    db: AsyncSession = Depends(get_async_session),
+    current_user: User = Depends(get_current_user)
+) -> dict:
+    results, scheduled, events = await task_batch.update_tasks(db, current_user, items)
+    await db.commit()
+    for quadrant, urgent_from in scheduled:
+        urgency_scheduler.schedule(quadrant, urgent_from)
+    await task_events.publish_many(events)
+
+    return fast_json(task_batch.batch_response(results))
+
+
+@router.post("/batch/complete", response_model=TaskBatchResult)
+async def complete_tasks_batch(
+    batch: TaskBatchComplete,
+    db: AsyncSession = Depends(get_async_session),
+    current_user: User = Depends(get_current_user)
+) -> dict:
+    results, events = await task_batch.complete_tasks(db, current_user, batch.ids, batch.completed)
+    await db.commit()
+    await task_events.publish_many(events)
+    return fast_json(task_batch.batch_response(results))
+
+
+@router.post("/batch/delete", response_model=TaskBatchResult)
+async def delete_tasks_batch(
+    batch: TaskBatchIds,
+    db: AsyncSession = Depends(get_async_session),
+    current_user: User = Depends(get_current_user)
+) -> dict:
+    results, events = await task_batch.delete_tasks(db, current_user, batch.ids)
+    await db.commit()
+    await task_events.publish_many(events)
+    return fast_json(task_batch.batch_response(results))
+
+# IMPORT TASKS - Загрузка задач из NDJSON/CSV в теле запроса
+@router.post("/import", response_model=TaskImportResult)
+async def import_tasks(
+    request: Request,
+    import_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    db: AsyncSession = Depends(get_async_session),
+    current_user: User = Depends(get_current_user)
+) -> dict:
+    # Тело читается потоком и разбирается построчно; commit на каждую пачку,
+    # поэтому при обрыве соединения уже загруженные пачки сохраняются
+    lines = task_import.read_lines(request.stream())
+    if import_format == "csv":
+        records = task_import.csv_records(lines)
+    else:
+        records = task_import.ndjson_records(lines)
+
+    return fast_json(await task_import.import_tasks(db, current_user.id, records))
 
 # PUT - ОБНОВЛЕНИЕ ЗАДАЧИ
 @router.put("/{task_id}", response_model=TaskResponse)
@@ -293,47 +408,60 @@ async def update_task(
     task_update: TaskUpdate,
     db: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user)
-) -> TaskResponse:
-    result = await db.execute(
-        select(Task).where(Task.id == task_id)
-    )
-    task = result.scalar_one_or_none()
-
-    if not task:
-        raise HTTPException(status_code=404, detail="Задача не найдена")
-
-    if current_user.role.value != 'admin' and task.user_id!= current_user.id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Нет доступа к этой задаче")
-    
+) -> dict:
+    now = datetime.now(timezone.utc)
     update_data = task_update.model_dump(exclude_unset=True)
+    owner_id = await _write_owner(db, current_user, task_id)
+    change_seq = await next_version(db, owner_id)
+    owned = (Task.id == task_id, Task.user_id == owner_id)
+
+    before, conditions = None, list(owned)
+    if update_data.keys() & {"is_important", "deadline_at", "completed"}:
+        # Счётчикам нужно прежнее состояние задачи, а квадранту — неизменяемые поля.
+        # Правка названия или описания обходится без этого чтения
+        current = (await db.execute(
+            select(Task.quadrant, Task.completed, Task.is_important, Task.deadline_at)
+            .where(*owned)
+            .with_for_update()
+        )).one_or_none()
+        if current is None:
+            await _raise_not_written(db, task_id)
+        before = (current.quadrant, current.completed)
+        # Дельты счётчиков считаются от прочитанного состояния — запись выполняется,
+        # только если задачу с тех пор не изменили (например, планировщик или toggle)
+        conditions += [Task.quadrant == current.quadrant, Task.completed == current.completed]
+
+        if "is_important" in update_data or "deadline_at" in update_data:
+            is_important = update_data.get("is_important", current.is_important)
+            deadline_at = update_data.get("deadline_at", current.deadline_at)
+            update_data["quadrant"] = calculate_quadrant(is_important, deadline_at, now)
+            update_data["urgent_from"] = calculate_urgent_from(deadline_at)
+        # Как в пакетном изменении (task_batch.update_tasks)
+        if "completed" in update_data and update_data["completed"] != current.completed:
+            update_data["completed_at"] = now if update_data["completed"] else None
 
-    for field, value in update_data.items():
-        setattr(task, field, value)
-
-    if "is_important" in update_data or "deadline_at" in update_data:
-        task.quadrant = calculate_quadrant(task.is_important, task.deadline_at)
-
+    result = await db.execute(
+        update(Task)
+        .where(*conditions)
+        .values(**update_data, change_seq=change_seq)
+        .returning(*TASK_COLUMNS, Task.urgent_from)
+        .execution_options(synchronize_session=False)
+    )
+    row = result.one_or_none()
+    if row is None:
+        if before is not None and await db.scalar(select(Task.id).where(*owned)) is not None:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT,
+                                detail="Задача изменена параллельно, повторите запрос")
+        await _raise_not_written(db, task_id)
+
+    after = (row.quadrant, row.completed)
+    await apply_task_change(db, owner_id, before or after, after)
     await db.commit()
-    await db.refresh(task)
+    urgency_scheduler.schedule(row.quadrant, row.urgent_from)
 
-    # Добавляем расчетные поля для ответа
-    is_urgent = calculate_urgency(task.deadline_at)
-    days_until_deadline = calculate_days_until_deadline(task.deadline_at)
-    
-    return TaskResponse(
-        id=task.id,
-        title=task.title,
-        description=task.description,
-        is_important=task.is_important,
-        deadline_at=task.deadline_at,
-        quadrant=task.quadrant,
-        is_urgent=is_urgent,
-        days_until_deadline=days_until_deadline,
-        completed=task.completed,
-        created_at=task.created_at,
-        completed_at=task.completed_at,
-        user_id = task.user_id
-    )
+    response = serialize_tasks([row[:len(TASK_COLUMNS)]], now)[0]
+    await task_events.publish(task_event("updated", owner_id, task_id, response, change_seq=change_seq))
+    return fast_json(response)
 
 # @router.patch("/{task_id}/complete", response_model=TaskResponse)
 # async def complete_task(
@@ -389,16 +517,33 @@ async def toggle_task(
     task_id: int,
     db: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user)
-):
-    result = await db.execute(select(Task).where(Task.id == task_id))
-    task = result.scalar_one_or_none()
+) -> dict:
+    now = datetime.now(timezone.utc)
+    owner_id = await _write_owner(db, current_user, task_id)
+    change_seq = await next_version(db, owner_id)
 
-    task.completed = not task.completed
-    task.completed_at = datetime.now(timezone.utc) if task.completed else None
+    # Выражения SET видят значения до изменения: переключение без чтения задачи
+    result = await db.execute(
+        update(Task)
+        .where(Task.id == task_id, Task.user_id == owner_id)
+        .values(
+            completed=~Task.completed,
+            completed_at=case((Task.completed, None), else_=now),
+            change_seq=change_seq
+        )
+        .returning(*TASK_COLUMNS)
+        .execution_options(synchronize_session=False)
+    )
+    row = result.one_or_none()
+    if row is None:
+        await _raise_not_written(db, task_id)
 
+    await apply_task_change(db, owner_id, (row.quadrant, not row.completed), (row.quadrant, row.completed))
     await db.commit()
-    await db.refresh(task)
-    return task
+
+    response = serialize_tasks([row], now)[0]
+    await task_events.publish(task_event("updated", owner_id, task_id, response, change_seq=change_seq))
+    return fast_json(response)
 
 
 # DELETE - УДАЛЕНИЕ ЗАДАЧИ
@@ -408,87 +553,27 @@ async def delete_task(
     db: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user)
 ) -> dict:
+    owner_id = await _write_owner(db, current_user, task_id)
+    change_seq = await next_version(db, owner_id)
+
     result = await db.execute(
-        select(Task).where(Task.id == task_id)
+        delete(Task)
+        .where(Task.id == task_id, Task.user_id == owner_id)
+        .returning(Task.id, Task.title, Task.quadrant, Task.completed)
+        .execution_options(synchronize_session=False)
     )
-    task = result.scalar_one_or_none()
-    
-    if not task:
-        raise HTTPException(status_code=404, detail="Задача не найдена")
-    
-    if current_user.role.value != 'admin' and task.user_id!= current_user.id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Нет доступа к этой задаче")
-    
-    deleted_task_info = {
-        "id": task.id,
-        "title": task.title
-    }
-    
-    await db.delete(task)
+    deleted = result.one_or_none()
+    if deleted is None:
+        await _raise_not_written(db, task_id)
+
+    # Отметка об удалении для клиентов, синхронизирующихся через /tasks/changes
+    await db.execute(insert(TaskTombstone).values(user_id=owner_id, task_id=task_id, change_seq=change_seq))
+    await apply_task_change(db, owner_id, before=(deleted.quadrant, deleted.completed))
     await db.commit()
+    await task_events.publish(task_event("deleted", owner_id, task_id, change_seq=change_seq))
 
     return {
         "message": "Задача успешно удалена",
-        "id": deleted_task_info["id"],
-        "title": deleted_task_info["title"]
+        "id": deleted.id,
+        "title": deleted.title
     }
-
-# GET TASKS (TODAY) - Получить задачи, срок которых истекает сегодня
-@router.get("/today", response_model=List[TaskResponse])
-async def get_tasks_due_today(
-    db: AsyncSession = Depends(get_async_session),
-    current_user: User = Depends(get_current_user)
-) -> List[TaskResponse]:
-    """Получить задачи, срок выполнения которых истекает сегодня"""
-    today = datetime.now(timezone.utc).date()
-    
-    if current_user.role.value == 'admin':
-        result = await db.execute(
-            select(Task).where(
-                Task.deadline_at.isnot(None),
-                Task.completed == False
-            )
-        )
-    else:
-        result = await db.execute(
-            select(Task).where(
-                Task.user_id == current_user.id,
-                Task.deadline_at.isnot(None),
-                Task.completed == False
-            )
-        )
-
-    tasks = result.scalars().all()
-    
-    today_tasks = []
-    for task in tasks:
-        if task.deadline_at:
-            if task.deadline_at.tzinfo:
-                deadline_date = task.deadline_at.astimezone(timezone.utc).date()
-            else:
-                deadline_date = task.deadline_at.date()
-            
-            if deadline_date == today:
-                today_tasks.append(task)
-    
-    response_tasks = []
-    for task in today_tasks:
-        is_urgent = calculate_urgency(task.deadline_at)
-        days_until_deadline = calculate_days_until_deadline(task.deadline_at)
-        
-        response_tasks.append(TaskResponse(
-            id=task.id,
-            title=task.title,
-            description=task.description,
-            is_important=task.is_important,
-            deadline_at=task.deadline_at,
-            quadrant=task.quadrant,
-            is_urgent=is_urgent,
-            days_until_deadline=days_until_deadline,
-            completed=task.completed,
-            created_at=task.created_at,
-            completed_at=task.completed_at,
-            user_id = task.user_id
-        ))
-    
-    return response_tasks
\ No newline at end of file
@@ -1,10 +1,10 @@
 from fastapi import APIRouter, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 from database import get_async_session
-from dependencies import get_current_user
+from dependencies import get_current_user, get_current_user_for_update
 from models import User
-from schemas_user import UserUpdate
-from auth_utils import get_password_hash
+from schemas import UserUpdate
+from auth_utils import get_password_hash_async
 
 router = APIRouter(prefix="/users", tags=["users"])
 
@@ -21,13 +21,13 @@ async def get_me(current_user: User = Depends(get_current_user)):
 async def update_me(
     data: UserUpdate,
     db: AsyncSession = Depends(get_async_session),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user_for_update)
 ):
     if data.nickname:
         current_user.nickname = data.nickname
 
     if data.password:
-        current_user.hashed_password = get_password_hash(data.password)
+        current_user.hashed_password = await get_password_hash_async(data.password)
 
     await db.commit()
     return {"message": "Профиль обновлён"}
@@ -0,0 +1,205 @@
+import asyncio
+import heapq
+import logging
+import os
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+from sqlalchemy import case, select, update
+
+from database import AsyncSessionLocal
+from models import Task
+from task_stats import apply_counter_deltas, next_versions
+from utils import URGENT_QUADRANTS
+
+logger = logging.getLogger(__name__)
+
+SCHEDULER_ENABLED = os.getenv("URGENCY_SCHEDULER_ENABLED", "1") == "1"
+BATCH_SIZE = int(os.getenv("URGENCY_SCHEDULER_BATCH_SIZE", "500"))
+HEAP_LIMIT = int(os.getenv("URGENCY_SCHEDULER_HEAP_LIMIT", "10000"))
+# Периодическая перезагрузка кучи подхватывает задачи, созданные другими процессами
+REFRESH_INTERVAL = timedelta(seconds=int(os.getenv("URGENCY_SCHEDULER_REFRESH_SECONDS", "300")))
+RETRY_DELAY = 30
+
+# Срочный квадрант -> несрочный, из которого в него переносятся задачи
+_SOURCE_QUADRANTS = {target: source for source, target in URGENT_QUADRANTS.items()}
+
+
+def _aware(value: datetime) -> datetime:
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+class UrgencyScheduler:
+    """Переносит задачи из Q2/Q4 в Q1/Q3 в момент наступления urgent_from.
+
+    В памяти хранится min-куча ближайших моментов перехода (не более HEAP_LIMIT).
+    Сам перенос — пакетный UPDATE по индексу (quadrant, urgent_from), поэтому
+    устаревшие записи в куче безвредны: условие перепроверяется в SQL.
+    """
+
+    def __init__(self, session_factory=AsyncSessionLocal):
+        self._session_factory = session_factory
+        self._heap: List[datetime] = []
+        self._loaded_until: Optional[datetime] = None
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+        self.tasks_moved = 0
+        self.batches = 0
+        self.last_run_at: Optional[datetime] = None
+        self.lag_seconds = 0.0
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def schedule(self, quadrant: str, urgent_from: Optional[datetime]) -> None:
+        """Сообщить о задаче, записанной в этом процессе (вызывается после commit)"""
+        if self._task is None or quadrant not in URGENT_QUADRANTS or urgent_from is None:
+            return
+        urgent_from = _aware(urgent_from)
+        # Задачи за пределами загруженного окна подхватит следующая перезагрузка кучи
+        if self._loaded_until is None or urgent_from < self._loaded_until:
+            heapq.heappush(self._heap, urgent_from)
+            self._wakeup.set()
+
+    def metrics(self) -> dict:
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "tasks_moved": self.tasks_moved,
+            "batches": self.batches,
+            "heap_size": len(self._heap),
+            "next_transition_at": self._heap[0] if self._heap else None,
+            "last_run_at": self.last_run_at,
+            "lag_seconds": self.lag_seconds,
+        }
+
+    async def rebucket_due(self, now: datetime) -> int:
+        """Перенести все задачи, ставшие срочными к моменту now, пакетами по BATCH_SIZE"""
+        moved = 0
+        while True:
+            batch = await self._rebucket_batch(now)
+            moved += batch
+            if batch < BATCH_SIZE:
+                return moved
+
+    async def _rebucket_batch(self, now: datetime) -> int:
+        became_urgent = (
+            Task.quadrant.in_(URGENT_QUADRANTS.keys()),
+            Task.urgent_from < now
+        )
+
+        async with self._session_factory() as db:
+            due = (await db.execute(
+                select(Task.id, Task.user_id)
+                .where(*became_urgent)
+                .order_by(Task.urgent_from)
+                .limit(BATCH_SIZE)
+            )).all()
+            if not due:
+                self.lag_seconds = 0.0
+                return 0
+
+            # Перенос — изменение задачи: она получает новую версию и попадает
+            # в /tasks/changes, а новая версия сбрасывает ETag списков и /stats.
+            # Версии берутся до UPDATE, как у остальных записей (см. task_stats.next_versions)
+            versions = await next_versions(db, [user_id for _, user_id in due])
+            rows = (await db.execute(
+                update(Task)
+                .where(Task.id.in_([task_id for task_id, _ in due]), *became_urgent)
+                .values(
+                    quadrant=case(
+                        *[(Task.quadrant == source, target) for source, target in URGENT_QUADRANTS.items()]
+                    ),
+                    change_seq=case(versions, value=Task.user_id)
+                )
+                .returning(Task.user_id, Task.quadrant, Task.completed, Task.urgent_from)
+                .execution_options(synchronize_session=False)
+            )).all()
+
+            # Счётчики user_task_stats меняются в той же транзакции, одним UPDATE на пользователя
+            deltas = defaultdict(Counter)
+            for user_id, quadrant, completed, urgent_from in rows:
+                deltas[user_id][_SOURCE_QUADRANTS[quadrant].lower()] -= 1
+                deltas[user_id][quadrant.lower()] += 1
+            for user_id, user_deltas in deltas.items():
+                await apply_counter_deltas(db, user_id, user_deltas)
+            await db.commit()
+
+        if not rows:
+            # Задачи успели изменить между выборкой и переносом
+            self.lag_seconds = 0.0
+            return 0
+        oldest = min(_aware(row.urgent_from) for row in rows)
+        self.lag_seconds = max((now - oldest).total_seconds(), 0.0)
+        self.tasks_moved += len(rows)
+        self.batches += 1
+        return len(rows)
+
+    async def _load_upcoming(self, now: datetime) -> None:
+        """Перестроить кучу индексированным диапазонным запросом по urgent_from"""
+        async with self._session_factory() as db:
+            result = await db.execute(
+                select(Task.urgent_from)
+                .where(Task.quadrant.in_(URGENT_QUADRANTS.keys()), Task.urgent_from >= now)
+                .order_by(Task.urgent_from)
+                .limit(HEAP_LIMIT)
+            )
+            upcoming = [_aware(value) for value in result.scalars()]
+
+        self._heap = upcoming  # отсортированный список уже является кучей
+        refresh_at = now + REFRESH_INTERVAL
+        if len(upcoming) == HEAP_LIMIT:
+            self._loaded_until = min(upcoming[-1], refresh_at)
+        else:
+            self._loaded_until = refresh_at
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                now = datetime.now(timezone.utc)
+                # После рестарта: сначала догоняем пропущенные переходы, затем строим кучу
+                await self.rebucket_due(now)
+                await self._load_upcoming(now)
+                self.last_run_at = now
+
+                while True:
+                    wake_at = self._loaded_until
+                    if self._heap and self._heap[0] < wake_at:
+                        wake_at = self._heap[0]
+                    timeout = (wake_at - datetime.now(timezone.utc)).total_seconds()
+
+                    self._wakeup.clear()
+                    if timeout > 0:
+                        try:
+                            await asyncio.wait_for(self._wakeup.wait(), timeout)
+                            continue  # в кучу добавлен более ранний момент — пересчитать ожидание
+                        except asyncio.TimeoutError:
+                            pass
+
+                    now = datetime.now(timezone.utc)
+                    while self._heap and self._heap[0] <= now:
+                        heapq.heappop(self._heap)
+                    await self.rebucket_due(now)
+                    self.last_run_at = now
+
+                    if now >= self._loaded_until:
+                        await self._load_upcoming(now)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Ошибка планировщика срочности, повтор через %s с", RETRY_DELAY)
+                await asyncio.sleep(RETRY_DELAY)
+
+
+urgency_scheduler = UrgencyScheduler()
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, validator
-from typing import Optional
+from typing import Any, List, Optional
 from datetime import datetime, timezone
 
 
@@ -88,6 +88,117 @@ class TaskResponse(TaskBase):
         from_attributes = True
 
 
+# Страница задач для курсорной (keyset) пагинации
+class TaskPage(BaseModel):
+    items: List[TaskResponse] = Field(
+        ...,
+        description="Задачи текущей страницы")
+    next_cursor: Optional[str] = Field(
+        None,
+        description="Курсор следующей страницы (null, если страниц больше нет)")
+
+
+# Удалённая задача в изменениях после токена синхронизации
+class TaskDeletion(BaseModel):
+    id: int = Field(
+        ...,
+        description="Идентификатор удалённой задачи (повторно не выдаётся)")
+    change_seq: int = Field(
+        ...,
+        description="Версия задач пользователя, в которой задача удалена")
+
+
+# Изменения задач после токена синхронизации
+class TaskChanges(BaseModel):
+    items: List[TaskResponse] = Field(
+        ...,
+        description="Созданные и изменённые задачи в порядке изменения")
+    deleted: List[TaskDeletion] = Field(
+        ...,
+        description="Удалённые задачи; их id не встречаются в items")
+    next_token: str = Field(
+        ...,
+        description="Токен для следующего запроса since")
+    has_more: bool = Field(
+        ...,
+        description="Есть ещё изменения — повторить запрос с next_token")
+
+
+# Пакетные операции над задачами
+class TaskBatchUpdate(TaskUpdate):
+    id: int = Field(
+        ...,
+        description="Идентификатор изменяемой задачи")
+
+
+class TaskBatchIds(BaseModel):
+    ids: List[int] = Field(
+        ...,
+        min_length=1,
+        description="Идентификаторы задач")
+
+
+class TaskBatchComplete(TaskBatchIds):
+    completed: bool = Field(
+        True,
+        description="Новый статус выполнения")
+
+
+class TaskBatchItemResult(BaseModel):
+    index: int = Field(
+        ...,
+        description="Позиция элемента в запросе")
+    status: int = Field(
+        ...,
+        description="HTTP-статус обработки элемента",
+        examples=[201])
+    id: Optional[int] = Field(
+        None,
+        description="Идентификатор задачи")
+    task: Optional[TaskResponse] = Field(
+        None,
+        description="Задача после изменения")
+    error: Optional[Any] = Field(
+        None,
+        description="Причина отказа")
+
+
+class TaskBatchResult(BaseModel):
+    succeeded: int = Field(
+        ...,
+        description="Количество успешно обработанных элементов")
+    failed: int = Field(
+        ...,
+        description="Количество отклонённых элементов")
+    results: List[TaskBatchItemResult] = Field(
+        ...,
+        description="Результат по каждому элементу в порядке запроса")
+
+
+# Итог загрузки задач из файла
+class TaskImportError(BaseModel):
+    line: int = Field(
+        ...,
+        description="Номер строки в файле")
+    error: Any = Field(
+        ...,
+        description="Причина отказа")
+
+
+class TaskImportResult(BaseModel):
+    imported: int = Field(
+        ...,
+        description="Количество созданных задач")
+    rejected: int = Field(
+        ...,
+        description="Количество отклонённых строк")
+    errors: List[TaskImportError] = Field(
+        ...,
+        description="Отклонённые строки (не больше TASK_IMPORT_MAX_ERRORS)")
+    errors_truncated: bool = Field(
+        ...,
+        description="Список ошибок обрезан")
+
 
 class UserUpdate(BaseModel):
     nickname: Optional[str] = None
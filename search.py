@@ -0,0 +1,133 @@
+import re
+from typing import List, Optional, Tuple
+
+from sqlalchemy import func, literal_column, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import Task
+from pagination import paginate, split_page
+from serializers import TASK_COLUMNS
+
+# SQLite: внешний FTS5-индекс поверх tasks, синхронизируется триггерами
+SQLITE_FTS_TABLE = """
+CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5(
+    title, description,
+    content='tasks', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2'
+)
+"""
+
+SQLITE_FTS_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS tasks_fts_ai AFTER INSERT ON tasks BEGIN
+        INSERT INTO tasks_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS tasks_fts_ad AFTER DELETE ON tasks BEGIN
+        INSERT INTO tasks_fts(tasks_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS tasks_fts_au AFTER UPDATE OF title, description ON tasks BEGIN
+        INSERT INTO tasks_fts(tasks_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO tasks_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+]
+
+# PostgreSQL: вычисляемая tsvector-колонка и GIN-индекс по ней
+POSTGRES_SEARCH_DDL = [
+    """
+    ALTER TABLE tasks ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        to_tsvector('simple', coalesce(title, '') || ' ' || coalesce(description, ''))
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_tasks_search_vector ON tasks USING GIN (search_vector)",
+]
+
+
+def create_search_index(connection) -> None:
+    """Создать поисковый индекс, если его ещё нет (идемпотентно)"""
+    dialect = connection.dialect.name
+
+    if dialect == "sqlite":
+        exists = connection.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'tasks_fts'"
+        )).first()
+        connection.execute(text(SQLITE_FTS_TABLE))
+        for trigger in SQLITE_FTS_TRIGGERS:
+            connection.execute(text(trigger))
+        if not exists:
+            # Индекс появился у уже заполненной таблицы — проиндексировать существующие задачи
+            connection.execute(text("INSERT INTO tasks_fts(tasks_fts) VALUES ('rebuild')"))
+
+    elif dialect == "postgresql":
+        for statement in POSTGRES_SEARCH_DDL:
+            connection.execute(text(statement))
+
+
+def _tokens(q: str) -> List[str]:
+    return re.findall(r"\w+", q.lower())
+
+
+def _search_statement(dialect: str, tokens: List[str]):
+    """Запрос (колонки задачи, score) по совпадениям и колонки ключа сортировки (лучшие первыми)"""
+    if dialect == "sqlite":
+        # Каждое слово — префиксный поиск, слова объединяются через AND; rank (bm25) тем меньше, чем лучше
+        fts_query = " ".join(f'"{token}"*' for token in tokens)
+        matches = (
+            select(
+                literal_column("tasks_fts.rowid").label("id"),
+                literal_column("tasks_fts.rank").label("score")
+            )
+            .select_from(text("tasks_fts"))
+            .where(text("tasks_fts MATCH :fts_query").bindparams(fts_query=fts_query))
+            .subquery()
+        )
+        stmt = select(*TASK_COLUMNS, matches.c.score).join(matches, Task.id == matches.c.id)
+        return stmt, [matches.c.score, Task.id]
+
+    if dialect == "postgresql":
+        ts_query = func.to_tsquery("simple", " & ".join(f"{token}:*" for token in tokens))
+        search_vector = literal_column("tasks.search_vector")
+        score = -func.ts_rank(search_vector, ts_query)
+        stmt = select(*TASK_COLUMNS, score.label("score")).where(search_vector.op("@@")(ts_query))
+        return stmt, [score, Task.id]
+
+    # Прочие СУБД: подстрочный поиск без индекса
+    keyword = f"%{' '.join(tokens)}%"
+    stmt = select(*TASK_COLUMNS).where(
+        Task.title.ilike(keyword) | Task.description.ilike(keyword)
+    )
+    return stmt, [Task.id]
+
+
+async def search_tasks_page(
+    db: AsyncSession,
+    q: str,
+    user_id: Optional[int],
+    limit: int,
+    cursor: Optional[str]
+) -> Tuple[List, Optional[str]]:
+    """Страница строк TASK_COLUMNS, ранжированных по релевантности; user_id=None — по всем пользователям"""
+    tokens = _tokens(q)
+    if not tokens:
+        return [], None
+
+    stmt, columns = _search_statement(db.get_bind().dialect.name, tokens)
+    if user_id is not None:
+        stmt = stmt.where(Task.user_id == user_id)
+
+    result = await db.execute(paginate(stmt, columns, limit, cursor))
+    if len(columns) == 2:
+        key = lambda row: (row.score, row.id)
+    else:
+        key = lambda row: (row.id,)
+    rows, next_cursor = split_page(result.all(), limit, key)
+    return [tuple(row)[:len(TASK_COLUMNS)] for row in rows], next_cursor
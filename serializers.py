@@ -0,0 +1,65 @@
+import time
+from datetime import datetime, timezone
+from typing import Iterable, List, Optional, Sequence
+
+from models import Task
+from profiling import record_serialize
+from utils import URGENT_QUADRANTS
+
+# Колонки, из которых строится TaskResponse. Списки выбирают их напрямую
+# (select(*TASK_COLUMNS)) и получают кортежи без создания ORM-объектов.
+TASK_COLUMNS = (
+    Task.id,
+    Task.title,
+    Task.description,
+    Task.is_important,
+    Task.deadline_at,
+    Task.quadrant,
+    Task.completed,
+    Task.created_at,
+    Task.completed_at,
+)
+
+def serialize_tasks(rows: Sequence[Sequence], now: Optional[datetime] = None) -> List[dict]:
+    """Построить ответы TaskResponse для пачки строк.
+
+    Расчётные поля считаются по колонкам целиком от одного снимка now, вместо
+    вызова calculate_urgency/calculate_days_until_deadline на каждую задачу.
+    """
+    if not rows:
+        return []
+
+    started = time.perf_counter()
+    if now is None:
+        now = datetime.now(timezone.utc)
+
+    (ids, titles, descriptions, important, deadlines,
+     quadrants, completed, created, completed_at) = zip(*rows)
+
+    # SQLite возвращает datetime без tzinfo — считаем такие значения UTC (как utils.calculate_urgency)
+    naive_now = now.replace(tzinfo=None)
+    days: List[Optional[int]] = [
+        None if deadline is None
+        else ((deadline - naive_now) if deadline.tzinfo is None else (deadline - now)).days
+        for deadline in deadlines
+    ]
+    urgent = [value is not None and value <= 3 for value in days]
+    # Сохранённый Q2/Q4 мог устареть: задача, ставшая срочной, относится к Q1/Q3
+    effective = [
+        URGENT_QUADRANTS.get(quadrant, quadrant) if is_urgent else quadrant
+        for quadrant, is_urgent in zip(quadrants, urgent)
+    ]
+
+    keys = ("title", "description", "is_important", "deadline_at", "id", "quadrant",
+            "is_urgent", "days_until_deadline", "completed", "created_at", "completed_at")
+    serialized = [
+        dict(zip(keys, values))
+        for values in zip(titles, descriptions, important, deadlines, ids, effective,
+                          urgent, days, completed, created, completed_at)
+    ]
+    record_serialize(len(serialized), time.perf_counter() - started)
+    return serialized
+
+
+def task_page(rows: Iterable[Sequence], next_cursor: Optional[str], now: Optional[datetime] = None) -> dict:
+    return {"items": serialize_tasks(list(rows), now), "next_cursor": next_cursor}
@@ -3,25 +3,43 @@ let currentFilter = "all";
 
 document.addEventListener("DOMContentLoaded", () => {
     loadTasks("all");
+    subscribeTaskEvents();
 });
 
+/* ================= EVENTS ================= */
+
+// Изменения из других вкладок и устройств приходят через /tasks/stream вместо опроса.
+// EventSource не передаёт заголовки, поэтому токен идёт в параметре запроса;
+// после обрыва браузер переподключается сам
+let reloadTimer = null;
+
+function subscribeTaskEvents() {
+    const token = localStorage.getItem("token");
+    if (!token || !window.EventSource) return;
+
+    const source = new EventSource(`/tasks/stream?access_token=${encodeURIComponent(token)}`);
+    const reload = () => {
+        // Пакетная операция присылает событие на каждую задачу — перечитываем список один раз
+        clearTimeout(reloadTimer);
+        reloadTimer = setTimeout(() => loadTasks(currentFilter), 300);
+    };
+
+    ["created", "updated", "deleted", "bulk", "resync"].forEach(type => {
+        source.addEventListener(type, reload);
+    });
+}
+
 /* ================= TASKS ================= */
 
 async function loadTasks(filter = "all") {
     currentFilter = filter;
 
-    const res = await fetch("/tasks", {
-        headers: {
-            "Authorization": "Bearer " + localStorage.getItem("token")
-        }
-    });
-
-    if (!res.ok) {
+    const tasks = await fetchAllTasks();
+    if (tasks === null) {
         console.error("Не удалось загрузить задачи");
         return;
     }
 
-    const tasks = await res.json();
     const list = document.getElementById("tasks");
     list.innerHTML = "";
 
@@ -82,6 +100,32 @@ async function loadTasks(filter = "all") {
     document.getElementById("stat-active").innerText = total - done;
 }
 
+// Список отдаётся страницами: идём по next_cursor, пока он не станет null
+async function fetchAllTasks() {
+    const tasks = [];
+    let cursor = null;
+
+    do {
+        const url = cursor
+            ? `/tasks?limit=500&cursor=${encodeURIComponent(cursor)}`
+            : "/tasks?limit=500";
+
+        const res = await fetch(url, {
+            headers: {
+                "Authorization": "Bearer " + localStorage.getItem("token")
+            }
+        });
+
+        if (!res.ok) return null;
+
+        const page = await res.json();
+        tasks.push(...page.items);
+        cursor = page.next_cursor;
+    } while (cursor);
+
+    return tasks;
+}
+
 async function toggleTask(id, completed) {
     await fetch(`/tasks/${id}`, {
         method: "PUT",
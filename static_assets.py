@@ -0,0 +1,118 @@
+import json
+import mimetypes
+import os
+from typing import Dict, Optional, Tuple
+
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse
+from starlette.types import Scope
+
+STATIC_DIR = os.getenv("STATIC_DIR", "static")
+# Каталог сборки внутри STATIC_DIR: файлы с хэшем содержимого в имени и их .br/.gz
+DIST_DIR = "dist"
+MANIFEST_NAME = "manifest.json"
+
+# Имя файла меняется вместе с содержимым, поэтому браузер может не перепроверять его год
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Файлы без хэша (сборка не выполнялась) перепроверяются по ETag при каждой загрузке
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+# Порядок предпочтения, если клиент принимает несколько кодировок
+PRECOMPRESSED = (("br", ".br"), ("gzip", ".gz"))
+
+
+def load_manifest(directory: str = STATIC_DIR) -> Dict[str, str]:
+    """Исходное имя -> имя с хэшем из manifest.json, пусто без сборки"""
+    try:
+        with open(os.path.join(directory, DIST_DIR, MANIFEST_NAME), encoding="utf-8") as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {}
+
+
+_manifest = load_manifest()
+
+
+def static_url(name: str) -> str:
+    """URL ассета для шаблонов: версия с хэшем, если сборка выполнялась"""
+    fingerprinted = _manifest.get(name)
+    if fingerprinted is None:
+        return f"/static/{name}"
+    return f"/static/{DIST_DIR}/{fingerprinted}"
+
+
+def _accepted_encodings(headers: Headers) -> set:
+    accepted = set()
+    for part in headers.get("accept-encoding", "").split(","):
+        coding, _, params = part.partition(";")
+        params = params.replace(" ", "")
+        if params.startswith("q="):
+            try:
+                if float(params[2:]) == 0:
+                    continue  # q=0 — кодировка явно запрещена
+            except ValueError:
+                continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """StaticFiles, отдающий заранее сжатые .br/.gz рядом с файлом, если клиент их принимает.
+
+    Сжатые варианты ищутся один раз при запуске (файлы сборки неизменяемы),
+    поэтому запрос не делает лишних stat.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._variants: Dict[str, Dict[str, Tuple[str, os.stat_result]]] = {}
+        self._dist = os.path.realpath(os.path.join(self.directory, DIST_DIR)) if self.directory else None
+        if self._dist and os.path.isdir(self._dist):
+            for name in os.listdir(self._dist):
+                for encoding, suffix in PRECOMPRESSED:
+                    if name.endswith(suffix):
+                        path = os.path.join(self._dist, name)
+                        original = os.path.realpath(path[:-len(suffix)])
+                        self._variants.setdefault(original, {})[encoding] = (path, os.stat(path))
+
+    @staticmethod
+    def _precompressed(variants: dict, headers: Headers) -> Optional[Tuple[str, str, os.stat_result]]:
+        accepted = _accepted_encodings(headers)
+        for encoding, _ in PRECOMPRESSED:
+            if encoding in accepted and encoding in variants:
+                return (encoding, *variants[encoding])
+        return None
+
+    def file_response(
+        self,
+        full_path,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        request_headers = Headers(scope=scope)
+        media_type = mimetypes.guess_type(str(full_path))[0] or "text/plain"
+        # lookup_path уже вернул реальный путь
+        variants = self._variants.get(str(full_path))
+        fingerprinted = os.path.dirname(full_path) == self._dist
+
+        encoding = None
+        precompressed = self._precompressed(variants, request_headers) if variants else None
+        if precompressed is not None:
+            # ETag и Content-Length берутся из stat сжатого файла, поэтому у вариантов разные ETag
+            encoding, full_path, stat_result = precompressed
+
+        response = FileResponse(full_path, status_code=status_code, stat_result=stat_result,
+                                media_type=media_type)
+        if encoding is not None:
+            # Ответ без сжатия получает Vary от GZipMiddleware, сжатый она пропускает как есть
+            response.headers["Content-Encoding"] = encoding
+            response.headers.add_vary_header("Accept-Encoding")
+
+        response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL if fingerprinted else REVALIDATE_CACHE_CONTROL
+
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
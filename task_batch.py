@@ -0,0 +1,302 @@
+import os
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Type
+
+from fastapi import HTTPException, status
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import case, delete, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from events import task_event
+from models import Task, TaskTombstone, User
+from schemas import TaskBatchUpdate, TaskCreate
+from serializers import TASK_COLUMNS, serialize_tasks
+from task_stats import apply_task_changes, next_version, next_versions
+from utils import calculate_quadrant, calculate_urgent_from
+
+MAX_BATCH_SIZE = int(os.getenv("TASK_BATCH_MAX_SIZE", "1000"))
+
+NOT_FOUND = "Задача не найдена"
+FORBIDDEN = "Нет доступа к этой задаче"
+DUPLICATE = "Задача указана в пакете несколько раз"
+
+
+def check_batch_size(size: int) -> None:
+    if size > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Не более {MAX_BATCH_SIZE} элементов за один запрос"
+        )
+
+
+def batch_response(results: List[dict]) -> dict:
+    results.sort(key=lambda item: item["index"])
+    failed = sum(1 for item in results if item["status"] >= 400)
+    return {"succeeded": len(results) - failed, "failed": failed, "results": results}
+
+
+def _error(index: int, code: int, error: Any, task_id: Optional[int] = None) -> dict:
+    return {"index": index, "status": code, "id": task_id, "task": None, "error": error}
+
+
+def validation_errors(exc: ValidationError) -> List[dict]:
+    return [{"loc": error["loc"], "msg": error["msg"], "type": error["type"]} for error in exc.errors()]
+
+
+def _validate(items: Sequence[Any], schema: Type[BaseModel]) -> Tuple[List[Tuple[int, BaseModel]], List[dict]]:
+    """Проверить элементы по отдельности: невалидный элемент не отклоняет весь пакет"""
+    valid, rejected = [], []
+    for index, item in enumerate(items):
+        try:
+            valid.append((index, schema.model_validate(item)))
+        except ValidationError as exc:
+            rejected.append(_error(index, status.HTTP_422_UNPROCESSABLE_ENTITY, validation_errors(exc)))
+    return valid, rejected
+
+
+async def _load_owned(
+    db: AsyncSession,
+    current_user: User,
+    indexed_ids: Sequence[Tuple[int, int]]
+) -> Tuple[Dict[int, Any], List[int], List[dict]]:
+    """Одним SELECT найти задачи пакета и проверить права.
+
+    Возвращает {id: строка} существующих задач, индексы разрешённых элементов
+    и отказы (404, 403, повтор id в пакете).
+    """
+    ids = {task_id for _, task_id in indexed_ids}
+    rows = {}
+    if ids:
+        result = await db.execute(
+            select(Task.id, Task.user_id, Task.quadrant, Task.completed,
+                   Task.is_important, Task.deadline_at)
+            .where(Task.id.in_(ids))
+        )
+        rows = {row.id: row for row in result.all()}
+
+    is_admin = current_user.role.value == "admin"
+    allowed, rejected, seen = [], [], set()
+    for index, task_id in indexed_ids:
+        row = rows.get(task_id)
+        if task_id in seen:
+            rejected.append(_error(index, status.HTTP_409_CONFLICT, DUPLICATE, task_id))
+        elif row is None:
+            rejected.append(_error(index, status.HTTP_404_NOT_FOUND, NOT_FOUND, task_id))
+        elif not is_admin and row.user_id != current_user.id:
+            rejected.append(_error(index, status.HTTP_403_FORBIDDEN, FORBIDDEN, task_id))
+        else:
+            allowed.append(index)
+        seen.add(task_id)
+    return rows, allowed, rejected
+
+
+async def _owners(db: AsyncSession, current_user: User, ids: Sequence[int]) -> List[int]:
+    """Владельцы задач пакета; пользователь может писать только в свои задачи"""
+    if not ids:
+        return []
+    if current_user.role.value != "admin":
+        return [current_user.id]
+    # Владелец задачи не меняется, поэтому его можно прочитать до блокировки
+    return list((await db.execute(select(Task.user_id).where(Task.id.in_(ids)).distinct())).scalars())
+
+
+def _owner_filter(current_user: User) -> list:
+    # Права проверены заранее; условие в WHERE защищает от смены владельца между запросами
+    if current_user.role.value == "admin":
+        return []
+    return [Task.user_id == current_user.id]
+
+
+async def create_tasks(db: AsyncSession, current_user: User, items: Sequence[Any]) -> Tuple[List[dict], list, list]:
+    """Создать задачи одним многострочным INSERT ... RETURNING.
+
+    Возвращает результаты по элементам, пары (quadrant, urgent_from) для планировщика
+    и события для публикации после commit.
+    """
+    check_batch_size(len(items))
+    valid, results = _validate(items, TaskCreate)
+    if not valid:
+        return results, [], []
+
+    now = datetime.now(timezone.utc)
+    change_seq = await next_version(db, current_user.id)
+    values = [
+        {
+            "title": task.title,
+            "description": task.description,
+            "is_important": task.is_important,
+            "deadline_at": task.deadline_at,
+            "urgent_from": calculate_urgent_from(task.deadline_at),
+            "quadrant": calculate_quadrant(task.is_important, task.deadline_at, now),
+            "completed": False,
+            "user_id": current_user.id,
+            "change_seq": change_seq,
+        }
+        for _, task in valid
+    ]
+    # Без sentinel-колонки SQLAlchemy выполняет sort_by_parameter_order в SQLite построчно.
+    # SQLite выдаёт id строкам многострочного INSERT по порядку (AUTOINCREMENT),
+    # поэтому там тот же порядок даёт сортировка результата по id.
+    # render_nulls: иначе строки с None и без делятся на отдельные INSERT
+    is_sqlite = db.get_bind().dialect.name == "sqlite"
+    result = await db.execute(
+        insert(Task)
+        .returning(*TASK_COLUMNS, sort_by_parameter_order=not is_sqlite)
+        .execution_options(render_nulls=True),
+        values
+    )
+    rows = result.all()
+    if is_sqlite:
+        rows.sort(key=lambda row: row.id)
+    await apply_task_changes(db, [(current_user.id, None, (value["quadrant"], False)) for value in values])
+
+    events = []
+    for (index, _), task in zip(valid, serialize_tasks(rows, now)):
+        results.append({"index": index, "status": status.HTTP_201_CREATED, "id": task["id"],
+                        "task": task, "error": None})
+        events.append(task_event("created", current_user.id, task["id"], task, change_seq=change_seq))
+    return results, [(value["quadrant"], value["urgent_from"]) for value in values], events
+
+
+async def update_tasks(db: AsyncSession, current_user: User, items: Sequence[Any]) -> Tuple[List[dict], list, list]:
+    """Изменить задачи: один SELECT, один executemany UPDATE по первичному ключу и один SELECT результата"""
+    check_batch_size(len(items))
+    valid, results = _validate(items, TaskBatchUpdate)
+    # Версии берутся до чтения задач: под блокировкой строки счётчиков прочитанное
+    # состояние, от которого считаются дельты, не устареет до UPDATE
+    versions = await next_versions(db, await _owners(db, current_user, [item.id for _, item in valid]))
+    current, allowed, rejected = await _load_owned(db, current_user, [(index, item.id) for index, item in valid])
+    results.extend(rejected)
+
+    updates = dict(valid)
+    now = datetime.now(timezone.utc)
+    params, changes, scheduled, updated = [], [], [], []
+    for index in allowed:
+        item = updates[index]
+        row = current[item.id]
+        data = item.model_dump(exclude_unset=True, exclude={"id"})
+        updated.append((index, item.id))
+        if not data:
+            continue
+
+        if "is_important" in data or "deadline_at" in data:
+            is_important = data.get("is_important", row.is_important)
+            deadline_at = data.get("deadline_at", row.deadline_at)
+            data["quadrant"] = calculate_quadrant(is_important, deadline_at, now)
+            data["urgent_from"] = calculate_urgent_from(deadline_at)
+            scheduled.append((data["quadrant"], data["urgent_from"]))
+        if "completed" in data and data["completed"] != row.completed:
+            data["completed_at"] = now if data["completed"] else None
+
+        params.append({"id": item.id, **data})
+        changes.append((
+            row.user_id,
+            (row.quadrant, row.completed),
+            (data.get("quadrant", row.quadrant), data.get("completed", row.completed))
+        ))
+
+    if params:
+        for param, (user_id, _, _) in zip(params, changes):
+            param["change_seq"] = versions[user_id]
+        await db.execute(update(Task), params)
+        await apply_task_changes(db, changes)
+
+    events = []
+    if updated:
+        result = await db.execute(
+            select(*TASK_COLUMNS).where(Task.id.in_([task_id for _, task_id in updated]))
+        )
+        tasks = {task["id"]: task for task in serialize_tasks(result.all(), now)}
+        for index, task_id in updated:
+            results.append({"index": index, "status": status.HTTP_200_OK, "id": task_id,
+                            "task": tasks[task_id], "error": None})
+        for param in params:
+            user_id = current[param["id"]].user_id
+            events.append(task_event("updated", user_id, param["id"], tasks[param["id"]],
+                                     change_seq=versions[user_id]))
+    return results, scheduled, events
+
+
+async def complete_tasks(db: AsyncSession, current_user: User, ids: Sequence[int],
+                         completed: bool) -> Tuple[List[dict], list]:
+    """Выставить статус выполнения одним UPDATE ... WHERE id IN (...) RETURNING"""
+    check_batch_size(len(ids))
+    current, allowed, results = await _load_owned(db, current_user, list(enumerate(ids)))
+
+    now = datetime.now(timezone.utc)
+    allowed_ids = {ids[index] for index in allowed}
+    changing = [task_id for task_id in allowed_ids if current[task_id].completed != completed]
+    unchanged = allowed_ids.difference(changing)
+
+    rows, changed, versions = [], [], {}
+    if changing:
+        versions = await next_versions(db, [current[task_id].user_id for task_id in changing])
+        result = await db.execute(
+            update(Task)
+            .where(Task.id.in_(changing), Task.completed != completed, *_owner_filter(current_user))
+            .values(completed=completed, completed_at=now if completed else None,
+                    change_seq=case(versions, value=Task.user_id))
+            .returning(*TASK_COLUMNS, Task.user_id)
+            .execution_options(synchronize_session=False)
+        )
+        returned = result.all()
+        await apply_task_changes(db, [
+            (row.user_id, (row.quadrant, not completed), (row.quadrant, completed)) for row in returned
+        ])
+        rows.extend(row[:len(TASK_COLUMNS)] for row in returned)
+        changed = [(row.id, row.user_id) for row in returned]
+    if unchanged:
+        result = await db.execute(select(*TASK_COLUMNS).where(Task.id.in_(unchanged)))
+        rows.extend(result.all())
+
+    tasks = {task["id"]: task for task in serialize_tasks(rows, now)}
+    for index in allowed:
+        task = tasks.get(ids[index])
+        if task is None:
+            # Задачу удалили или изменили параллельно между SELECT и UPDATE
+            results.append(_error(index, status.HTTP_409_CONFLICT, "Задача изменена параллельно", ids[index]))
+        else:
+            results.append({"index": index, "status": status.HTTP_200_OK, "id": task["id"],
+                            "task": task, "error": None})
+    events = [
+        task_event("updated", user_id, task_id, tasks[task_id], change_seq=versions[user_id])
+        for task_id, user_id in changed
+    ]
+    return results, events
+
+
+async def delete_tasks(db: AsyncSession, current_user: User, ids: Sequence[int]) -> Tuple[List[dict], list]:
+    """Удалить задачи одним DELETE ... WHERE id IN (...) RETURNING"""
+    check_batch_size(len(ids))
+    current, allowed, results = await _load_owned(db, current_user, list(enumerate(ids)))
+
+    deleted = {}
+    if allowed:
+        versions = await next_versions(db, [current[ids[index]].user_id for index in allowed])
+        result = await db.execute(
+            delete(Task)
+            .where(Task.id.in_([ids[index] for index in allowed]), *_owner_filter(current_user))
+            .returning(Task.id, Task.user_id, Task.quadrant, Task.completed)
+            .execution_options(synchronize_session=False)
+        )
+        deleted = {row.id: row for row in result.all()}
+        if deleted:
+            await db.execute(insert(TaskTombstone), [
+                {"user_id": row.user_id, "task_id": row.id, "change_seq": versions[row.user_id]}
+                for row in deleted.values()
+            ])
+        await apply_task_changes(db, [
+            (row.user_id, (row.quadrant, row.completed), None) for row in deleted.values()
+        ])
+
+    for index in allowed:
+        if ids[index] in deleted:
+            results.append({"index": index, "status": status.HTTP_200_OK, "id": ids[index],
+                            "task": None, "error": None})
+        else:
+            results.append(_error(index, status.HTTP_404_NOT_FOUND, NOT_FOUND, ids[index]))
+    events = [
+        task_event("deleted", row.user_id, row.id, change_seq=versions[row.user_id])
+        for row in deleted.values()
+    ]
+    return results, events
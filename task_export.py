@@ -0,0 +1,80 @@
+import csv
+import io
+import os
+from datetime import datetime, timezone
+from typing import AsyncIterator, List, Optional
+
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from models import Task
+from responses import dumps
+from serializers import TASK_COLUMNS, serialize_tasks
+
+EXPORT_CHUNK_SIZE = int(os.getenv("TASK_EXPORT_CHUNK_SIZE", "1000"))
+
+# Поля TaskResponse и владелец задачи (для резервных копий администратора)
+CSV_FIELDS = ("id", "user_id", "title", "description", "is_important", "deadline_at", "quadrant",
+              "is_urgent", "days_until_deadline", "completed", "created_at", "completed_at")
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+def export_statement(user_id: Optional[int] = None):
+    stmt = select(*TASK_COLUMNS, Task.user_id).order_by(Task.id)
+    if user_id is not None:
+        stmt = stmt.where(Task.user_id == user_id)
+    # yield_per включает серверный курсор: строки приходят пачками, а не все сразу
+    return stmt.execution_options(yield_per=EXPORT_CHUNK_SIZE)
+
+
+async def export_chunks(session_factory: async_sessionmaker, user_id: Optional[int] = None) -> AsyncIterator[List[dict]]:
+    """Выдавать задачи пачками по EXPORT_CHUNK_SIZE; в памяти держится только текущая пачка"""
+    now = datetime.now(timezone.utc)
+    async with session_factory() as db:
+        result = await db.stream(export_statement(user_id))
+        async for partition in result.partitions():
+            items = serialize_tasks([row[:-1] for row in partition], now)
+            for item, row in zip(items, partition):
+                item["user_id"] = row.user_id
+            yield items
+
+
+async def ndjson_chunks(session_factory: async_sessionmaker, user_id: Optional[int] = None) -> AsyncIterator[bytes]:
+    async for items in export_chunks(session_factory, user_id):
+        yield b"".join(dumps(item) + b"\n" for item in items)
+
+
+def _csv_value(value):
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+async def csv_chunks(session_factory: async_sessionmaker, user_id: Optional[int] = None) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_FIELDS)
+    yield buffer.getvalue().encode()
+
+    async for items in export_chunks(session_factory, user_id):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([_csv_value(item[field]) for field in CSV_FIELDS] for item in items)
+        yield buffer.getvalue().encode()
+
+
+def export_response(export_format: str, session_factory: async_sessionmaker,
+                    user_id: Optional[int] = None) -> StreamingResponse:
+    chunks = csv_chunks if export_format == "csv" else ndjson_chunks
+    return StreamingResponse(
+        chunks(session_factory, user_id),
+        media_type=EXPORT_FORMATS[export_format],
+        headers={"Content-Disposition": f'attachment; filename="tasks.{export_format}"'}
+    )
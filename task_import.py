@@ -0,0 +1,165 @@
+import codecs
+import csv
+import json
+import os
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from events import task_event, task_events
+from models import Task
+from schemas import TaskCreate
+from scheduler import urgency_scheduler
+from task_batch import validation_errors
+from task_stats import apply_task_changes, next_version
+from utils import calculate_quadrant, calculate_urgent_from
+
+IMPORT_BATCH_SIZE = int(os.getenv("TASK_IMPORT_BATCH_SIZE", "5000"))
+# В ответ попадают первые IMPORT_MAX_ERRORS отклонённых строк, остальные только считаются
+IMPORT_MAX_ERRORS = int(os.getenv("TASK_IMPORT_MAX_ERRORS", "1000"))
+IMPORT_MAX_LINE_LENGTH = int(os.getenv("TASK_IMPORT_MAX_LINE_LENGTH", str(64 * 1024)))
+
+# (номер строки, запись или None, ошибка или None)
+ImportRecord = Tuple[int, Optional[dict], Optional[Any]]
+
+
+async def read_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, Optional[str]]]:
+    """Разбить поток байтов на пронумерованные строки, не читая его целиком.
+
+    Строка длиннее IMPORT_MAX_LINE_LENGTH отбрасывается и выдаётся как None.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    tail, line_no, skipping = "", 0, False
+
+    async for chunk in chunks:
+        lines = (tail + decoder.decode(chunk)).split("\n")
+        tail = lines.pop()
+        for line in lines:
+            line_no += 1
+            if skipping:
+                skipping = False
+                yield line_no, None
+            else:
+                yield line_no, line.rstrip("\r")
+        if len(tail) > IMPORT_MAX_LINE_LENGTH:
+            tail, skipping = "", True
+
+    tail += decoder.decode(b"", final=True)
+    if tail or skipping:
+        yield line_no + 1, None if skipping else tail.rstrip("\r")
+
+
+async def ndjson_records(lines: AsyncIterator[Tuple[int, Optional[str]]]) -> AsyncIterator[ImportRecord]:
+    async for line_no, line in lines:
+        if line is None:
+            yield line_no, None, "Строка слишком длинная"
+            continue
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield line_no, None, "Некорректный JSON"
+            continue
+        if not isinstance(record, dict):
+            yield line_no, None, "Ожидался JSON-объект"
+            continue
+        yield line_no, record, None
+
+
+async def csv_records(lines: AsyncIterator[Tuple[int, Optional[str]]]) -> AsyncIterator[ImportRecord]:
+    """Записи CSV с заголовком; поле в кавычках может занимать несколько строк"""
+    header: Optional[List[str]] = None
+    pending: List[str] = []
+    start = 0
+
+    async for line_no, line in lines:
+        if line is None:
+            pending = []
+            yield line_no, None, "Строка слишком длинная"
+            continue
+        if not pending:
+            start = line_no
+        pending.append(line)
+        text = "\n".join(pending)
+        if text.count('"') % 2:
+            continue  # кавычка не закрыта — запись продолжается на следующей строке
+        pending = []
+        if not text.strip():
+            continue
+
+        values = next(csv.reader([text]))
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        if len(values) != len(header):
+            yield start, None, "Число полей не совпадает с заголовком"
+            continue
+        # Пустое поле CSV — отсутствующее значение
+        yield start, {name: value if value != "" else None for name, value in zip(header, values)}, None
+
+    if pending:
+        yield start, None, "Не закрыта кавычка"
+
+
+async def _insert_batch(db: AsyncSession, user_id: int, values: List[dict]) -> None:
+    change_seq = await next_version(db, user_id)
+    for value in values:
+        value["change_seq"] = change_seq
+    await db.execute(insert(Task.__table__), values)
+    await apply_task_changes(db, [(user_id, None, (value["quadrant"], False)) for value in values])
+    await db.commit()
+    for value in values:
+        urgency_scheduler.schedule(value["quadrant"], value["urgent_from"])
+    # Одно событие на пачку: клиенту дешевле дочитать изменения через /tasks/changes
+    await task_events.publish(task_event("bulk", user_id, change_seq=change_seq, count=len(values)))
+
+
+async def import_tasks(db: AsyncSession, user_id: int, records: AsyncIterator[ImportRecord]) -> dict:
+    """Проверить записи по TaskCreate и вставлять пачками по IMPORT_BATCH_SIZE, commit на пачку"""
+    imported, rejected, errors = 0, 0, []
+    batch: List[dict] = []
+    now = datetime.now(timezone.utc)
+
+    async for line_no, record, error in records:
+        if error is None:
+            try:
+                task = TaskCreate.model_validate(record)
+            except ValidationError as exc:
+                error = validation_errors(exc)
+
+        if error is not None:
+            rejected += 1
+            if len(errors) < IMPORT_MAX_ERRORS:
+                errors.append({"line": line_no, "error": error})
+            continue
+
+        batch.append({
+            "title": task.title,
+            "description": task.description,
+            "is_important": task.is_important,
+            "deadline_at": task.deadline_at,
+            "urgent_from": calculate_urgent_from(task.deadline_at),
+            "quadrant": calculate_quadrant(task.is_important, task.deadline_at, now),
+            "completed": False,
+            "user_id": user_id,
+        })
+        if len(batch) >= IMPORT_BATCH_SIZE:
+            await _insert_batch(db, user_id, batch)
+            imported += len(batch)
+            batch = []
+            now = datetime.now(timezone.utc)
+
+    if batch:
+        await _insert_batch(db, user_id, batch)
+        imported += len(batch)
+
+    return {
+        "imported": imported,
+        "rejected": rejected,
+        "errors": errors,
+        "errors_truncated": rejected > len(errors),
+    }
@@ -0,0 +1,202 @@
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import Task, UserTaskStats
+
+# Состояние задачи, влияющее на счётчики: (квадрант, выполнена ли)
+TaskState = Tuple[str, bool]
+
+COUNTER_COLUMNS = ("total", "q1", "q2", "q3", "q4", "completed", "pending")
+
+
+def _state_columns(state: TaskState) -> List[str]:
+    quadrant, completed = state
+    return ["total", quadrant.lower(), "completed" if completed else "pending"]
+
+
+def empty_counters() -> Dict[str, int]:
+    return {column: 0 for column in COUNTER_COLUMNS}
+
+
+def stats_response(counters: Dict[str, int]) -> dict:
+    """Привести счётчики к формату ответа /stats/"""
+    return {
+        "total_tasks": counters["total"],
+        "by_quadrant": {
+            "Q1": counters["q1"], "Q2": counters["q2"], "Q3": counters["q3"], "Q4": counters["q4"]
+        },
+        "by_status": {"completed": counters["completed"], "pending": counters["pending"]}
+    }
+
+
+async def read_counters(db: AsyncSession, user_id: Optional[int] = None) -> Dict[str, int]:
+    """Прочитать счётчики пользователя (по первичному ключу) или сумму по всем пользователям"""
+    if user_id is not None:
+        row = await db.get(UserTaskStats, user_id)
+        if row is None:
+            return empty_counters()
+        return {column: getattr(row, column) for column in COUNTER_COLUMNS}
+
+    row = (await db.execute(select(*[
+        func.coalesce(func.sum(getattr(UserTaskStats, column)), 0) for column in COUNTER_COLUMNS
+    ]))).one()
+    return dict(zip(COUNTER_COLUMNS, row))
+
+
+async def count_tasks(db: AsyncSession, user_id: Optional[int] = None) -> Dict[int, Dict[str, int]]:
+    """Пересчитать счётчики с нуля одним GROUP BY по таблице задач"""
+    stmt = select(
+        Task.user_id,
+        Task.quadrant,
+        Task.completed,
+        func.count().label("tasks_count")
+    ).group_by(Task.user_id, Task.quadrant, Task.completed)
+    if user_id is not None:
+        stmt = stmt.where(Task.user_id == user_id)
+
+    counters = defaultdict(empty_counters)
+    for owner_id, quadrant, completed, tasks_count in (await db.execute(stmt)).all():
+        for column in _state_columns((quadrant, completed)):
+            counters[owner_id][column] += tasks_count
+    return dict(counters)
+
+
+async def apply_task_change(
+    db: AsyncSession,
+    user_id: int,
+    before: Optional[TaskState] = None,
+    after: Optional[TaskState] = None
+) -> None:
+    """Применить изменение одной задачи к счётчикам владельца.
+
+    Вызывается до commit, поэтому счётчики меняются в той же транзакции, что и задача.
+    before=None — задача создана, after=None — задача удалена.
+    """
+    deltas = Counter()
+    if before is not None:
+        deltas.subtract(_state_columns(before))
+    if after is not None:
+        deltas.update(_state_columns(after))
+    await apply_counter_deltas(db, user_id, deltas)
+
+
+async def apply_task_changes(
+    db: AsyncSession,
+    changes: Iterable[Tuple[int, Optional[TaskState], Optional[TaskState]]]
+) -> None:
+    """Применить пачку изменений (user_id, before, after) — один UPDATE на пользователя"""
+    deltas = defaultdict(Counter)
+    for user_id, before, after in changes:
+        if before is not None:
+            deltas[user_id].subtract(_state_columns(before))
+        if after is not None:
+            deltas[user_id].update(_state_columns(after))
+    for user_id, user_deltas in deltas.items():
+        await apply_counter_deltas(db, user_id, user_deltas)
+
+
+async def apply_counter_deltas(db: AsyncSession, user_id: int, deltas: Dict[str, int]) -> None:
+    """Прибавить к счётчикам пользователя произвольные приращения {колонка: delta}.
+
+    Строку счётчиков и новую версию в этой транзакции уже создал next_versions.
+    """
+    values = {
+        column: getattr(UserTaskStats, column) + delta
+        for column, delta in deltas.items() if delta
+    }
+    if values:
+        await db.execute(
+            update(UserTaskStats)
+            .where(UserTaskStats.user_id == user_id)
+            .values(values)
+        )
+
+
+def _insert(db: AsyncSession):
+    """INSERT с поддержкой ON CONFLICT для диалекта сессии"""
+    return postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+
+
+async def next_versions(db: AsyncSession, user_ids: Iterable[int]) -> Dict[int, int]:
+    """Увеличить версию задач пользователей и вернуть новые значения.
+
+    Ими помечаются изменённые задачи (Task.change_seq) и отметки об удалении.
+    Вызывается до чтения и записи задач: UPDATE ... RETURNING блокирует строку
+    счётчиков (в SQLite — всю БД на запись), поэтому записи одного пользователя
+    идут по очереди и получают версии в порядке commit. Отдельный SELECT версии
+    такого не гарантирует: SQLite игнорирует FOR UPDATE.
+    """
+    versions = {}
+    # По одному UPDATE в порядке user_id: при нескольких владельцах блокировки
+    # берутся в одном порядке и параллельные пакеты не ждут друг друга по кругу
+    for user_id in sorted(set(user_ids)):
+        version = await db.scalar(
+            update(UserTaskStats)
+            .where(UserTaskStats.user_id == user_id)
+            .values(version=UserTaskStats.version + 1)
+            .returning(UserTaskStats.version)
+            .execution_options(synchronize_session=False)
+        )
+        if version is None:
+            # Строки ещё нет (пользователь появился до счётчиков) — считаем по задачам
+            # до текущей записи, её изменения затем прибавит apply_counter_deltas.
+            # Параллельная первая запись могла вставить строку раньше — тогда только новая версия
+            counters = (await count_tasks(db, user_id)).get(user_id, empty_counters())
+            stmt = _insert(db)(UserTaskStats).values(user_id=user_id, version=1, **counters)
+            version = await db.scalar(
+                stmt.on_conflict_do_update(
+                    index_elements=[UserTaskStats.user_id],
+                    set_={"version": UserTaskStats.version + 1}
+                ).returning(UserTaskStats.version)
+            )
+        versions[user_id] = version
+    return versions
+
+
+async def next_version(db: AsyncSession, user_id: int) -> int:
+    return (await next_versions(db, [user_id]))[user_id]
+
+
+async def read_version(db: AsyncSession, user_id: int) -> int:
+    """Версия задач пользователя (0 — пользователь ещё ничего не записывал)"""
+    version = await db.scalar(
+        select(UserTaskStats.version).where(UserTaskStats.user_id == user_id)
+    )
+    return version or 0
+
+
+async def find_drift(db: AsyncSession) -> Dict[int, Tuple[Dict[str, int], Dict[str, int]]]:
+    """Сравнить сохранённые счётчики с пересчитанными: {user_id: (сохранено, должно быть)}"""
+    expected = await count_tasks(db)
+    stored = {
+        row.user_id: {column: getattr(row, column) for column in COUNTER_COLUMNS}
+        for row in (await db.execute(select(UserTaskStats))).scalars()
+    }
+
+    drift = {}
+    for user_id in expected.keys() | stored.keys():
+        actual = stored.get(user_id, empty_counters())
+        should_be = expected.get(user_id, empty_counters())
+        if actual != should_be:
+            drift[user_id] = (actual, should_be)
+    return drift
+
+
+async def rebuild(db: AsyncSession) -> int:
+    """Полностью пересобрать таблицу счётчиков, вернуть число пользователей с задачами"""
+    counters = await count_tasks(db)
+    # Версии продолжают расти: иначе после пересборки ETag могли бы совпасть со старыми
+    versions = dict((await db.execute(select(UserTaskStats.user_id, UserTaskStats.version))).all())
+    await db.execute(delete(UserTaskStats))
+    if counters or versions:
+        await db.execute(insert(UserTaskStats), [
+            {"user_id": user_id, "version": versions.get(user_id, 0) + 1,
+             **counters.get(user_id, empty_counters())}
+            for user_id in counters.keys() | versions.keys()
+        ])
+    await db.commit()
+    return len(counters)
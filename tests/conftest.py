@@ -0,0 +1,87 @@
+"""Общие фикстуры тестов.
+
+Тесты идут против отдельной SQLite-базы во временном каталоге. Каждый запрос
+клиента `client` выполняется внутри query_guard.track(mode="raise"): превышение
+бюджета запросов или N+1 роняет запрос исключением QueryBudgetExceeded, а полный
+просмотр tasks/users проваливает тест после его завершения.
+"""
+import itertools
+import os
+import shutil
+import tempfile
+from typing import List
+
+# До импорта приложения: database и main читают настройки при импорте
+_DB_DIR = tempfile.mkdtemp(prefix="todo-tests-")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{os.path.join(_DB_DIR, 'test.db')}"
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
+os.environ["URGENCY_SCHEDULER_ENABLED"] = "0"
+# Отчёты заводит фикстура client, а не QueryGuardMiddleware
+os.environ["QUERY_GUARD"] = "off"
+
+import httpx
+import pytest
+
+import query_guard
+from create_tables import create_tables
+from database import engine
+from main import app
+
+query_guard.guard_engine(engine)
+
+_user_numbers = itertools.count(1)
+
+
+class GuardedTransport(httpx.ASGITransport):
+    """ASGITransport, выполняющий каждый запрос в своём QueryReport — как QueryGuardMiddleware"""
+
+    def __init__(self, app, reports: List[query_guard.QueryReport]):
+        super().__init__(app=app)
+        self.reports = reports
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        with query_guard.track(mode="raise", label=f"{request.method} {request.url.path}") as report:
+            response = await super().handle_async_request(request)
+        self.reports.append(report)
+        return response
+
+
+@pytest.fixture(scope="session")
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture(scope="session")
+async def database(anyio_backend):
+    await create_tables()
+    yield
+    await engine.dispose()
+    shutil.rmtree(_DB_DIR, ignore_errors=True)
+
+
+@pytest.fixture
+def query_reports() -> List[query_guard.QueryReport]:
+    """Отчёты query_guard по запросам клиента client, по одному на запрос"""
+    return []
+
+
+@pytest.fixture
+async def client(database, query_reports):
+    transport = GuardedTransport(app, query_reports)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+        yield http
+
+    scans = {shape: plan for report in query_reports for shape, plan in report.scans.items()}
+    if scans:
+        pytest.fail("Полный просмотр таблицы:\n" + "\n\n".join(f"{shape}\n{plan}" for shape, plan in scans.items()))
+
+
+@pytest.fixture
+async def auth_headers(client) -> dict:
+    """Заголовки нового пользователя (у каждого теста свой)"""
+    number = next(_user_numbers)
+    email = f"user{number}@example.com"
+    await client.post("/auth/register", json={"nickname": f"user{number}", "email": email,
+                                              "password": "secret123"})
+    response = await client.post("/auth/login", data={"username": email, "password": "secret123"})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
@@ -0,0 +1,90 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import select
+
+import query_guard
+from database import AsyncSessionLocal
+from models import Task
+
+pytestmark = pytest.mark.anyio
+
+# Больше страницы по умолчанию (50): N+1 и лишние запросы на второй странице видны сразу
+TASKS = 60
+
+LIST_URLS = [
+    "/tasks",
+    "/tasks?limit=10",
+    "/tasks/quadrant/Q1",
+    "/tasks/quadrant/Q2",
+    "/tasks/status/pending",
+    "/tasks/status/completed",
+    "/tasks/today",
+    "/tasks/due?from={today}&to={week}",
+    "/tasks/search?q=task",
+    "/tasks/changes",
+    "/stats/",
+    "/stats/deadlines",
+]
+
+
+@pytest.fixture
+async def tasks(client, auth_headers):
+    now = datetime.now(timezone.utc)
+    items = [
+        {
+            "title": f"task {index}",
+            "is_important": index % 2 == 0,
+            "deadline_at": (now + timedelta(hours=index * 6)).isoformat() if index % 3 else None,
+        }
+        for index in range(TASKS)
+    ]
+    response = await client.post("/tasks/batch", json=items, headers=auth_headers)
+    assert response.status_code == 200
+    ids = [result["id"] for result in response.json()["results"]]
+    response = await client.post("/tasks/batch/complete", json={"ids": ids[::4]}, headers=auth_headers)
+    assert response.status_code == 200
+    return ids
+
+
+@pytest.mark.parametrize("url", LIST_URLS)
+async def test_list_endpoints_within_query_budget(client, auth_headers, tasks, query_reports, url):
+    today = datetime.now(timezone.utc).date()
+    url = url.format(today=today, week=today + timedelta(days=7))
+
+    response = await client.get(url, headers=auth_headers)
+    assert response.status_code == 200, response.text
+    report = query_reports[-1]
+    assert report.queries <= query_guard.QUERY_BUDGET
+    assert not report.violations
+
+    # Вторая страница — тот же план запроса, но с keyset-условием
+    next_cursor = response.json().get("next_cursor")
+    if next_cursor:
+        separator = "&" if "?" in url else "?"
+        response = await client.get(f"{url}{separator}cursor={next_cursor}", headers=auth_headers)
+        assert response.status_code == 200, response.text
+        assert not query_reports[-1].violations
+
+
+async def test_changes_pages_within_query_budget(client, auth_headers, tasks, query_reports):
+    token, pages = None, 0
+    while True:
+        params = {"limit": 25, **({"since": token} if token else {})}
+        response = await client.get("/tasks/changes", params=params, headers=auth_headers)
+        assert response.status_code == 200
+        body = response.json()
+        token, pages = body["next_token"], pages + 1
+        if not body["has_more"]:
+            break
+    assert pages == 3
+    assert all(not report.violations for report in query_reports)
+
+
+async def test_guard_reports_repeated_queries(database):
+    # Проверка самого сторожа: цикл одинаковых запросов — N+1
+    with pytest.raises(query_guard.QueryBudgetExceeded):
+        with query_guard.track(mode="raise", label="N+1"):
+            async with AsyncSessionLocal() as db:
+                for task_id in range(query_guard.QUERY_REPEAT_LIMIT + 1):
+                    await db.execute(select(Task.title).where(Task.id == task_id))
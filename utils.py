@@ -1,12 +1,19 @@
-from datetime import datetime, timezone
-from typing import Optional
+from datetime import date, datetime, time, timedelta, timezone, tzinfo
+from typing import Optional, Tuple
 
-def calculate_urgency(deadline_at: Optional[datetime]) -> bool:
+# calculate_urgency считает задачу срочной, если (deadline - now).days <= 3,
+# то есть до дедлайна осталось меньше 4 полных суток
+URGENCY_WINDOW = timedelta(days=4)
+
+URGENT_QUADRANTS = {"Q2": "Q1", "Q4": "Q3"}  # куда переходит несрочная задача, став срочной
+
+def calculate_urgency(deadline_at: Optional[datetime], now: Optional[datetime] = None) -> bool:
     """Рассчитать срочность задачи (True если до дедлайна <= 3 дня)"""
     if deadline_at is None:
         return False
     
-    now = datetime.now(timezone.utc)
+    if now is None:
+        now = datetime.now(timezone.utc)
     
     if deadline_at.tzinfo is None:
         deadline_at = deadline_at.replace(tzinfo=timezone.utc)
@@ -29,9 +36,10 @@ def calculate_days_until_deadline(deadline_at: Optional[datetime]) -> Optional[i
     time_difference = deadline_at - now
     return time_difference.days
 
-def calculate_quadrant(is_important: bool, deadline_at: Optional[datetime]) -> str:
+def calculate_quadrant(is_important: bool, deadline_at: Optional[datetime],
+                       now: Optional[datetime] = None) -> str:
     """Рассчитать квадрант матрицы Эйзенхауэра на основе важности и дедлайна"""
-    is_urgent = calculate_urgency(deadline_at)
+    is_urgent = calculate_urgency(deadline_at, now)
     
     if is_important and is_urgent:
         return "Q1"  # Важно и срочно
@@ -40,4 +48,21 @@ def calculate_quadrant(is_important: bool, deadline_at: Optional[datetime]) -> s
     elif not is_important and is_urgent:
         return "Q3"  # Не важно, но срочно
     else:
-        return "Q4"  # Не важно и не срочно
\ No newline at end of file
+        return "Q4"  # Не важно и не срочно
+
+def calculate_urgent_from(deadline_at: Optional[datetime]) -> Optional[datetime]:
+    """Момент, после которого задача становится срочной (None — не станет никогда)"""
+    if deadline_at is None:
+        return None
+
+    if deadline_at.tzinfo is None:
+        deadline_at = deadline_at.replace(tzinfo=timezone.utc)
+
+    return deadline_at - URGENCY_WINDOW
+
+
+def day_range(first_day: date, last_day: date, tz: tzinfo) -> Tuple[datetime, datetime]:
+    """Полуинтервал [начало first_day, начало дня после last_day) в часовом поясе tz, в UTC"""
+    start = datetime.combine(first_day, time.min, tzinfo=tz)
+    end = datetime.combine(last_day + timedelta(days=1), time.min, tzinfo=tz)
+    return start.astimezone(timezone.utc), end.astimezone(timezone.utc)